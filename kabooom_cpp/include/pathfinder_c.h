@@ -0,0 +1,22 @@
+#pragma once
+#include <stdint.h>
+
+// C ABI over bfs() for foreign callers such as kabooom_py/cpp_bfs.py (ctypes).
+// grid is a row-major rows x cols array of cells (0 = free), trajectory holds
+// length (x, y) pairs and path_out must have room for length (x, y) pairs.
+// Returns the number of points written to path_out, i.e. the interception
+// time plus one, or 0 when the target cannot be intercepted.
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+    int64_t kabooom_bfs(const uint8_t *grid, int64_t rows, int64_t cols,
+                        int64_t start_x, int64_t start_y,
+                        const int64_t *trajectory, int64_t length,
+                        int64_t *path_out);
+
+#ifdef __cplusplus
+}
+#endif
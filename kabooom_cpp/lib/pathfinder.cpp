@@ -14,6 +14,11 @@ std::vector<Point> bfs(const Point &start_point, const std::vector<Point> &traje
 
     std::vector<Point> available_directions = {{0, 1}, {1, 0}, {0, -1}, {-1, 0}, {1, 1}, {1, -1}, {-1, 1}, {-1, -1}};
 
+    // Every path to a (t, x, y) state takes t moves, so the first time a state
+    // is queued is final and later duplicates are dropped. One flat layer of
+    // flags per time step, allocated when the search first reaches it.
+    std::vector<std::vector<uint8_t>> visited;
+
     while (!queue.empty())
     {
         auto current_node = std::move(queue.front());
@@ -21,7 +26,6 @@ std::vector<Point> bfs(const Point &start_point, const std::vector<Point> &traje
 
         if (current_node->intercepted())
         {
-            std::cout << "Intercepted the target!" << std::endl;
             return BackTrack(std::move(current_node));
         }
 
@@ -33,6 +37,22 @@ std::vector<Point> bfs(const Point &start_point, const std::vector<Point> &traje
 
                 if (current_time < static_cast<int>(trajectory.size()))
                 {
+                    if (static_cast<int>(visited.size()) <= current_time)
+                    {
+                        visited.resize(current_time + 1);
+                    }
+                    auto &layer = visited[current_time];
+                    if (layer.empty())
+                    {
+                        layer.assign(occupancy_map.cell_x * occupancy_map.cell_y, 0);
+                    }
+                    uint8_t &seen = layer[neighbour.x * occupancy_map.cell_y + neighbour.y];
+                    if (seen)
+                    {
+                        continue;
+                    }
+                    seen = 1;
+
                     Point target_point = trajectory[current_time];
                     Point ego_point = neighbour;
                     State next_state(target_point, ego_point, current_time);
@@ -0,0 +1,47 @@
+#include <pathfinder.hpp>
+#include <pathfinder_c.h>
+#include <algorithm>
+
+int64_t kabooom_bfs(const uint8_t *grid, int64_t rows, int64_t cols,
+                    int64_t start_x, int64_t start_y,
+                    const int64_t *trajectory, int64_t length,
+                    int64_t *path_out)
+{
+    if (length <= 0 || rows <= 0 || cols <= 0)
+    {
+        return 0;
+    }
+
+    // bfs() works on the nested-vector Map, so the caller's buffers are
+    // copied into one; both copies are linear and small next to the search
+    Map occupancy_map;
+    occupancy_map.cell_x = static_cast<int>(rows);
+    occupancy_map.cell_y = static_cast<int>(cols);
+    occupancy_map.grid.assign(rows, std::vector<uint8_t>(cols));
+    for (int64_t x = 0; x < rows; ++x)
+    {
+        std::copy(grid + x * cols, grid + (x + 1) * cols, occupancy_map.grid[x].begin());
+    }
+
+    std::vector<Point> target_trajectory(length);
+    for (int64_t t = 0; t < length; ++t)
+    {
+        target_trajectory[t] = {static_cast<int>(trajectory[2 * t]), static_cast<int>(trajectory[2 * t + 1])};
+    }
+
+    // No exception may cross the C boundary
+    try
+    {
+        auto path = bfs({static_cast<int>(start_x), static_cast<int>(start_y)}, target_trajectory, occupancy_map);
+        for (size_t i = 0; i < path.size(); ++i)
+        {
+            path_out[2 * i] = path[i].x;
+            path_out[2 * i + 1] = path[i].y;
+        }
+        return static_cast<int64_t>(path.size());
+    }
+    catch (...)
+    {
+        return 0;
+    }
+}
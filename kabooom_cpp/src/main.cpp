@@ -29,6 +29,7 @@ int main()
     else
 
     {
+        std::cout << "Intercepted the target!" << std::endl;
         std::cout << "Shortest path to strike the target:";
 
         for (const auto &point : path)
@@ -1,5 +1,6 @@
 #include <gtest/gtest.h>
 #include <pathfinder.hpp>
+#include <pathfinder_c.h>
 
 class TrajectoryGeneratorTest : public ::testing::Test
 {
@@ -147,6 +148,138 @@ TEST_F(BFSTest, TwoMovesAway) {
     EXPECT_EQ(expected_solution_time, size(solution)-1);
 }
 
+TEST_F(BFSTest, DetourAroundWall) {
+
+    // A wall across row 5 with a single gap at (5, 9); the stationary target
+    // takes 18 moves to reach, far too deep to search without dropping
+    // duplicate states
+    map = Map(1.0f, 10, 10);
+    for (int y = 0; y < 9; ++y)
+    {
+        map.grid[5][y] = 1;
+    }
+    target_trajectory = std::vector<Point>(30, Point{0, 0});
+    start = {9, 0};
+    std::vector<Point> solution = bfs(start, target_trajectory, map);
+
+    ASSERT_EQ(19, size(solution));
+    EXPECT_EQ(start, solution.front());
+    EXPECT_EQ(target_trajectory.back(), solution.back());
+    for (size_t t = 1; t < size(solution); ++t)
+    {
+        EXPECT_EQ(1, std::max(std::abs(solution[t].x - solution[t - 1].x), std::abs(solution[t].y - solution[t - 1].y)));
+        EXPECT_EQ(0, map.grid[solution[t].x][solution[t].y]);
+    }
+    EXPECT_EQ((Point{5, 9}), solution[9]);
+}
+
+TEST_F(BFSTest, WalledOffTarget) {
+
+    for (int i = 0; i < 3; ++i)
+    {
+        map.grid[2][i] = 1;
+        map.grid[i][2] = 1;
+    }
+    target_trajectory = std::vector<Point>(20, Point{0, 0});
+    start = {4, 4};
+    std::vector<Point> solution = bfs(start, target_trajectory, map);
+
+    EXPECT_TRUE(solution.empty());
+}
+
+///////////////////////////////////////////////////////////////////////////////////////////
+///////////////////////////////////////////////////////////////////////////////////////////
+///////////////////////////////////////////////////////////////////////////////////////////
+
+class KabooomBfsTest : public ::testing::Test {
+protected:
+    static constexpr int64_t rows = 5, cols = 5;
+    std::vector<uint8_t> grid;
+    std::vector<int64_t> trajectory;
+    std::vector<int64_t> path;
+
+    void SetUp() override
+    {
+        grid.assign(rows * cols, 0);
+    }
+
+    void SetTrajectory(const std::vector<Point> &points)
+    {
+        trajectory.clear();
+        for (const auto &point : points)
+        {
+            trajectory.push_back(point.x);
+            trajectory.push_back(point.y);
+        }
+        // Sentinel values show which entries kabooom_bfs wrote
+        path.assign(trajectory.size(), -1);
+    }
+
+    int64_t Solve(Point start)
+    {
+        return kabooom_bfs(grid.data(), rows, cols, start.x, start.y,
+                           trajectory.data(), static_cast<int64_t>(trajectory.size() / 2), path.data());
+    }
+};
+
+TEST_F(KabooomBfsTest, FillsPathBuffer) {
+
+    SetTrajectory({Point{0,0},Point{0,1},Point{0,2},Point{0,3},Point{0,4}});
+    ASSERT_EQ(5, Solve({4, 0}));
+
+    std::vector<int64_t> expected_path = {4, 0, 3, 1, 2, 2, 1, 3, 0, 4};
+    EXPECT_EQ(expected_path, path);
+}
+
+TEST_F(KabooomBfsTest, LeavesUnusedEntriesUntouched) {
+
+    SetTrajectory({Point{0,0},Point{0,1},Point{0,2},Point{0,3},Point{0,4}});
+    ASSERT_EQ(1, Solve({0, 0}));
+
+    std::vector<int64_t> expected_path = {0, 0, -1, -1, -1, -1, -1, -1, -1, -1};
+    EXPECT_EQ(expected_path, path);
+}
+
+TEST_F(KabooomBfsTest, AvoidsBlockedCells) {
+
+    // Row 2 is blocked except for (2, 4), so the diagonal is not available
+    for (int y = 0; y < 4; ++y)
+    {
+        grid[2 * cols + y] = 1;
+    }
+    SetTrajectory(std::vector<Point>(10, Point{0, 0}));
+    int64_t length = Solve({4, 0});
+
+    ASSERT_EQ(9, length);
+    for (int64_t t = 0; t < length; ++t)
+    {
+        EXPECT_EQ(0, grid[path[2 * t] * cols + path[2 * t + 1]]);
+    }
+    EXPECT_EQ(2, path[2 * 4]);
+    EXPECT_EQ(4, path[2 * 4 + 1]);
+}
+
+TEST_F(KabooomBfsTest, UnreachableTargetReturnsZero) {
+
+    // The target sits in a corner walled off by blocked cells
+    for (int i = 0; i < 3; ++i)
+    {
+        grid[2 * cols + i] = 1;
+        grid[i * cols + 2] = 1;
+    }
+    SetTrajectory(std::vector<Point>(20, Point{0, 0}));
+
+    EXPECT_EQ(0, Solve({4, 4}));
+    EXPECT_EQ(std::vector<int64_t>(40, -1), path);
+}
+
+TEST_F(KabooomBfsTest, TooShortTrajectoryReturnsZero) {
+
+    SetTrajectory({Point{0,0},Point{0,1},Point{0,2}});
+
+    EXPECT_EQ(0, Solve({4, 4}));
+}
+
 
 
 ///////////////////////////////////////////////////////////////////////////////////////////
@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from grid import Map
+from interception_field import UNREACHABLE
+from wavefront import wavefront_batch
+import numpy as np
+
+
+@dataclass
+class Assignment:
+    pairs: list
+    times: list
+    makespan: int
+    total: int
+
+
+def interception_matrix(start_points: np.ndarray, trajectories: list, occupancy_map: Map) -> np.ndarray:
+
+    # K x M earliest interception times, UNREACHABLE where an interceptor
+    # cannot catch a target; one batched sweep per target trajectory
+    starts = np.asarray(start_points, dtype=np.int64).reshape(-1, 2)
+    times = np.full((len(starts), len(trajectories)),
+                    UNREACHABLE, dtype=np.int64)
+
+    for target, trajectory in enumerate(trajectories):
+        times[:, target], _ = wavefront_batch(
+            starts, trajectory, occupancy_map, return_paths=False)
+
+    return times
+
+
+def assign(times: np.ndarray, objective: str = 'sum') -> Assignment:
+
+    # Pairs interceptors with targets, covering as many targets as can be
+    # caught at all. 'sum' minimises the total interception time, 'makespan'
+    # minimises the latest interception and breaks ties on the total.
+    times = np.asarray(times)
+    feasible = times != UNREACHABLE
+
+    if objective == 'sum':
+        pairs = _min_sum_pairs(times, feasible)
+    elif objective == 'makespan':
+        pairs = _min_makespan_pairs(times, feasible)
+    else:
+        raise ValueError(
+            f"Unknown objective '{objective}', select 'sum' or 'makespan'.")
+
+    pair_times = [int(times[i, j]) for i, j in pairs]
+    return Assignment(pairs, pair_times, max(pair_times, default=0), sum(pair_times))
+
+
+def _min_makespan_pairs(times: np.ndarray, feasible: np.ndarray) -> list:
+
+    # Smallest threshold that still admits a maximum-cardinality matching,
+    # then the cheapest assignment among edges under that threshold
+    size = _max_matching(feasible)
+    thresholds = np.unique(times[feasible])
+    lo, hi = 0, len(thresholds) - 1
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _max_matching(feasible & (times <= thresholds[mid])) == size:
+            hi = mid
+        else:
+            lo = mid + 1
+
+    if not len(thresholds):
+        return []
+    return _min_sum_pairs(times, feasible & (times <= thresholds[lo]))
+
+
+def _min_sum_pairs(times: np.ndarray, feasible: np.ndarray) -> list:
+
+    # Infeasible edges cost more than any set of feasible ones, so the
+    # Hungarian solution first maximises the number of real interceptions
+    if not feasible.any():
+        return []
+    cost = np.where(feasible, times, 0).astype(np.float64)
+    cost[~feasible] = (cost.max() + 1) * min(cost.shape) + 1
+
+    transposed = cost.shape[0] > cost.shape[1]
+    rows = _hungarian(cost.T if transposed else cost)
+    pairs = [(j, i) if transposed else (i, j) for i, j in enumerate(rows)]
+
+    return sorted((i, j) for i, j in pairs if feasible[i, j])
+
+
+def _hungarian(cost: np.ndarray) -> list:
+
+    # Shortest augmenting path Hungarian algorithm for n <= m rows/columns,
+    # returns the column assigned to each row. Index 0 is a virtual column.
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            used[j0] = True
+            reduced = cost[owner[j0] - 1] - u[owner[j0]] - v[1:]
+            open_columns = ~used[1:]
+            better = open_columns & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(open_columns, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+
+            j0 = j1
+            if owner[j0] == 0:
+                break
+
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    rows = [0] * n
+    for j in range(1, m + 1):
+        if owner[j]:
+            rows[owner[j] - 1] = j - 1
+    return rows
+
+
+def _max_matching(edges: np.ndarray) -> int:
+
+    # Kuhn's augmenting paths on a boolean K x M edge matrix
+    match = [-1] * edges.shape[1]
+    adjacency = [np.flatnonzero(row).tolist() for row in edges]
+
+    def augment(i, seen):
+        for j in adjacency[i]:
+            if not seen[j]:
+                seen[j] = True
+                if match[j] == -1 or augment(match[j], seen):
+                    match[j] = i
+                    return True
+        return False
+
+    return sum(augment(i, [False] * edges.shape[1]) for i in range(edges.shape[0]))
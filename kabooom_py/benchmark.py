@@ -0,0 +1,191 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from main import ALGORITHMS, generate_scenario
+from dataset import read_shard
+import bfs
+import numpy as np
+
+
+# bfs.bfs is the object-based state search; it keeps no visited set, so it
+# only finishes on the smallest cases and relies on the per-case timeout
+ENGINES = dict(ALGORITHMS, state_bfs=bfs.bfs)
+
+
+def run_case(case: dict, repeat: int, connection) -> None:
+
+    # Runs in a fresh process so peak memory is attributable to one case.
+    # A failure is sent back as {'error': ...} rather than left to the timeout.
+    try:
+        connection.send(_solve_case(case, repeat))
+    except Exception as error:
+        connection.send({'error': f"{type(error).__name__}: {error}"})
+    finally:
+        connection.close()
+
+
+def _solve_case(case: dict, repeat: int) -> dict:
+
+    solved_with = None
+    if 'dataset' in case:
+        scenarios, solved_with = read_shard(case['dataset'])
+        scenario = scenarios[case['index']]
+        dummy_map, start, tuple_of_trajs = scenario.to_map(), scenario.start, scenario.trajectory
+    else:
+        random.seed(case['seed'])
+        dummy_map, start, tuple_of_trajs = generate_scenario(argparse.Namespace(
+            map_width=case['map_width'], map_height=case['map_width'],
+            map_resolution=case['map_resolution'], num_obstacles=case['num_obstacles'],
+            circle=case['trajectory'] == 'circle'), np.random.default_rng(case['seed']))
+    solver = ENGINES[case['algorithm']]
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    wall_times = []
+    for _ in range(repeat):
+        solve_start = time.perf_counter()
+        search = solver(start, tuple_of_trajs, dummy_map)
+        wall_times.append(time.perf_counter() - solve_start)
+
+    measurement = {'wall_time': min(wall_times), 'expanded': search.expanded,
+                   'peak_memory_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss,
+                   'interception_time': search.interception_time,
+                   'trajectory_length': len(tuple_of_trajs)}
+    if solved_with is not None:
+        measurement['correct'] = search.interception_time == scenario.interception_time
+    return measurement
+
+
+def measure(case: dict, repeat: int, timeout: float) -> dict:
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    worker = multiprocessing.get_context('fork').Process(
+        target=run_case, args=(case, repeat, sender))
+    worker.start()
+    # Only the child may hold the sending end, so that its exit shows up as
+    # EOF instead of a poll that waits out the timeout
+    sender.close()
+
+    if not receiver.poll(timeout):
+        worker.terminate()
+        worker.join()
+        return dict(case, status='timeout')
+    try:
+        measurement = receiver.recv()
+    except EOFError:
+        worker.join()
+        return dict(case, status='error', error=f"worker exited with code {worker.exitcode}")
+    worker.join()
+    if 'error' in measurement:
+        return dict(case, status='error', **measurement)
+    return dict(case, status='ok', **measurement)
+
+
+def case_key(case: dict) -> tuple:
+
+    if 'dataset' in case:
+        return (case['algorithm'], case['dataset'], case['index'])
+    return (case['algorithm'], case['map_width'], case['map_resolution'],
+            case['num_obstacles'], case['trajectory'], case['seed'])
+
+
+def compare(cases: list, baseline: list, tolerance: float, min_delta: float) -> list:
+
+    # A case regresses when it got slower than the baseline by more than the
+    # relative tolerance and the absolute floor, or stopped finishing
+    previous = {case_key(case): case for case in baseline}
+    regressions = []
+
+    for case in cases:
+        before = previous.get(case_key(case))
+        if before is None or before['status'] != 'ok':
+            continue
+        if case['status'] != 'ok':
+            regressions.append(dict(case, baseline_wall_time=before['wall_time']))
+        elif case['wall_time'] > before['wall_time'] * (1 + tolerance) + min_delta:
+            regressions.append(dict(case, baseline_wall_time=before['wall_time'],
+                                    slowdown=case['wall_time'] / before['wall_time']))
+
+    return regressions
+
+
+def main(args):
+    if args.dataset:
+        # Replay stored scenarios instead of generating them
+        cases = [{'algorithm': algorithm, 'dataset': shard, 'index': index}
+                 for shard in args.dataset
+                 for algorithm, index in itertools.product(
+                     args.algorithms, range(len(read_shard(shard)[0])))]
+    else:
+        cases = [{'algorithm': algorithm, 'map_width': width, 'map_resolution': resolution,
+                  'num_obstacles': num_obstacles, 'trajectory': trajectory, 'seed': seed}
+                 for algorithm, width, resolution, num_obstacles, trajectory, seed in itertools.product(
+                     args.algorithms, args.map_sizes, args.map_resolutions, args.num_obstacles,
+                     args.trajectories, range(args.seeds))]
+
+    results = []
+    for case in cases:
+        results.append(measure(case, args.repeat, args.timeout))
+        print(json.dumps(results[-1]), file=sys.stderr, flush=True)
+
+    report = {'cases': results}
+    incorrect = [case for case in results if case.get('correct') is False]
+    if incorrect:
+        report['incorrect'] = incorrect
+    errors = [case for case in results if case['status'] == 'error']
+    if errors:
+        report['errors'] = errors
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['cases']
+        report['regressions'] = compare(
+            results, baseline, args.tolerance, args.min_delta)
+
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+
+    if incorrect:
+        print(f"{len(incorrect)} case(s) disagree with the cached ground truth")
+    if errors:
+        print(f"{len(errors)} case(s) raised, see 'errors' in {args.output}")
+    if report.get('regressions'):
+        print(f"{len(report['regressions'])} regression(s) against {args.baseline}")
+    if incorrect or errors or report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Benchmark the interception solvers across map sizes, obstacle densities and trajectory types.")
+    parser.add_argument('--algorithms', nargs='+', default=['bfs', 'dijkstra', 'astar', 'wavefront'],
+                        choices=list(ENGINES), help="Solvers to benchmark.")
+    parser.add_argument('--map_sizes', nargs='+', type=int, default=[3, 5, 10],
+                        help="Map widths (maps are square).")
+    parser.add_argument('--map_resolutions', nargs='+', type=float, default=[0.1],
+                        help="Map resolutions.")
+    parser.add_argument('--num_obstacles', nargs='+', type=int, default=[0, 20, 60],
+                        help="Obstacle counts.")
+    parser.add_argument('--trajectories', nargs='+', default=['wall', 'circle'],
+                        choices=['wall', 'circle'], help="Trajectory types.")
+    parser.add_argument('--seeds', type=int, default=3,
+                        help="Scenarios per configuration.")
+    parser.add_argument('--dataset', nargs='+', default=None,
+                        help="Scenario shards (see dataset.py) to replay instead of generating cases.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Solves per scenario; the fastest is reported.")
+    parser.add_argument('--timeout', type=float, default=60,
+                        help="Seconds before a case is abandoned.")
+    parser.add_argument('--output', type=str, default='benchmark.json',
+                        help="Where to write the JSON report.")
+    parser.add_argument('--baseline', type=str, default=None,
+                        help="Earlier report to compare against; regressions make the run fail.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Relative slowdown allowed before a case counts as a regression.")
+    parser.add_argument('--min_delta', type=float, default=0.005,
+                        help="Absolute slowdown in seconds ignored when flagging regressions.")
+
+    main(parser.parse_args())
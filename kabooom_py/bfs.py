@@ -1,11 +1,13 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import deque
-from grid import Map
+from grid import Map, Adjacency, EIGHT_CONNECTED
+from search_result import SearchResult, timed
 import numpy as np
 from math import isclose
 
 
+@dataclass
 class Point:
     x: int = 0
     y: int = 0
@@ -13,8 +15,8 @@ class Point:
 
 @dataclass(eq=False)
 class State:
-    target_state: Point = Point()
-    ego_state: Point = Point()
+    target_state: Point = field(default_factory=Point)
+    ego_state: Point = field(default_factory=Point)
     time_step: float = 0
 
     def __eq__(self, other):
@@ -26,8 +28,9 @@ class State:
                 isclose(self.time_step, other.time_step, rel_tol=1e-9))
 
 
+@dataclass(eq=False)
 class Node:
-    state: State = State()
+    state: State = field(default_factory=State)
     parent: Node = None
 
     def success(self) -> bool:
@@ -37,44 +40,60 @@ class Node:
         return f"({self.state.time_step},({self.state.ego_state.x},{self.state.ego_state.y}),({self.state.target_state.x},{self.state.target_state.y})) -> "
 
 
-def bfs(start_point: list, trajectory: np.ndarray, occupancy_map: Map):
+@timed
+def bfs(start_point: list, trajectory: np.ndarray, occupancy_map: Map,
+        on_expand=None, on_push=None) -> SearchResult:
 
     start = Node(State(Point(trajectory[0][0], trajectory[0][1]),
                        Point(start_point[0], start_point[1])))
     queue = deque()
     queue.append(start)
-    available_directions = np.array(
-        [[0, 1], [1, 0], [0, -1], [-1, 0], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+    adjacency = occupancy_map.get_adjacency(EIGHT_CONNECTED)
+    cols = occupancy_map.grid.shape[1]
+    overrides = occupancy_map.overrides or None
+    result = SearchResult(pushes=1, visited=1, max_open=1)
 
     while queue:
         current_node = queue.popleft()
+        result.expanded += 1
+        if on_expand is not None:
+            on_expand(current_node)
         if current_node.success():
-            return backtrack(current_node)
+            result.path = backtrack(current_node)
+            result.interception_time = current_node.state.time_step
+            return result
 
-        for neighbour in get_neighbours(current_node, available_directions):
-            if is_feasible(neighbour, occupancy_map):
-                current_time = current_node.state.time_step + 1
-                if current_time < len(trajectory):
-                    target_point = Point(
-                        trajectory[current_time][0], trajectory[current_time][1])
-                    ego_point = Point(neighbour[0], neighbour[1])
-                    next_state = State(target_point, ego_point, current_time)
-                    next_node = Node(next_state, current_node)
-                    queue.append(next_node)
+        current_time = current_node.state.time_step + 1
+        if current_time < len(trajectory):
+            for neighbour in get_neighbours(current_node, adjacency, cols):
+                if overrides and overrides.is_blocked(current_time, neighbour[0] * cols + neighbour[1]):
+                    continue
+                target_point = Point(
+                    trajectory[current_time][0], trajectory[current_time][1])
+                ego_point = Point(neighbour[0], neighbour[1])
+                next_state = State(target_point, ego_point, current_time)
+                next_node = Node(next_state, current_node)
+                queue.append(next_node)
+                result.pushes += 1
+                result.visited += 1
+                if on_push is not None:
+                    on_push(next_node)
+            result.max_open = max(result.max_open, len(queue))
 
-    return None
+    return result
 
 
-def get_neighbours(vertex: Node, movement_directions: np.ndarray = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]])) -> np.ndarray:
+def get_neighbours(vertex: Node, adjacency: Adjacency, cols: int) -> list:
 
-    return np.array([[vertex.state.ego_state.x, vertex.state.ego_state.y]]*len(movement_directions)) + movement_directions
+    # Free, in-bounds neighbours come straight from the map's cached table
+    cell = vertex.state.ego_state.x * cols + vertex.state.ego_state.y
+    return [divmod(neighbour, cols) for neighbour, _ in adjacency.neighbours(cell)]
 
-# Free space and bound check
+# Free space and bound check, at time_step when one is given
 
 
-def is_feasible(neighbour: np.ndarray, occupancy_map: Map):
-    x, y = neighbour[0], neighbour[1]
-    return (0 <= x < occupancy_map.grid.shape[0]) and (0 <= y < occupancy_map.grid.shape[1]) and (occupancy_map.grid[x, y] == 0)
+def is_feasible(neighbour: np.ndarray, occupancy_map: Map, time_step: int = None):
+    return occupancy_map.is_free(int(neighbour[0]), int(neighbour[1]), time_step)
 
 
 def backtrack(current_node: Node):
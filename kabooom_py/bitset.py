@@ -0,0 +1,52 @@
+import numpy as np
+
+
+# Boolean (rows, cols) layers stored one bit per cell: column y of a row lives
+# in bit y % 64 of word y // 64. Bits past the last column are always zero.
+
+
+def pack(layer: np.ndarray) -> np.ndarray:
+
+    rows, cols = layer.shape
+    words = -(-cols // 64)
+    packed = np.zeros((rows, words * 8), dtype=np.uint8)
+    packed[:, :-(-cols // 8)] = np.packbits(layer, axis=1, bitorder='little')
+    return packed.view('<u8')
+
+
+def unpack(words: np.ndarray, cols: int) -> np.ndarray:
+
+    return np.unpackbits(words.view(np.uint8), axis=1, count=cols, bitorder='little').astype(bool)
+
+
+def is_set(words: np.ndarray, x: int, y: int) -> bool:
+
+    # Plain ints throughout: shifting a Python int past 2**63 by a NumPy
+    # integer would overflow
+    x, y = int(x), int(y)
+    return bool((int(words[x, y >> 6]) >> (y & 63)) & 1)
+
+
+def count(words: np.ndarray) -> int:
+
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def dilate(words: np.ndarray, free_words: np.ndarray) -> np.ndarray:
+
+    # 8-neighbour step without staying in place: the left and right shifts,
+    # plus the rows above and below of the set widened by one column. Leading
+    # axes are a stack of independent layers sharing free_words.
+    left = words << np.uint64(1)
+    left[..., 1:] |= words[..., :-1] >> np.uint64(63)
+    right = words >> np.uint64(1)
+    right[..., :-1] |= words[..., 1:] << np.uint64(63)
+    widened = words | left | right
+
+    grown = left | right
+    grown[..., 1:, :] |= widened[..., :-1, :]
+    grown[..., :-1, :] |= widened[..., 1:, :]
+    grown &= free_words
+    return grown
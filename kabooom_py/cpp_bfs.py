@@ -0,0 +1,61 @@
+import ctypes
+import os
+from grid import Map
+from search_result import SearchResult, timed
+import fox_traversals
+import numpy as np
+
+
+# Built by the kabooom_cpp CMake project (target kabooom_c); KABOOOM_CPP_LIB
+# points at the shared library when it lives somewhere else
+LIBRARY_PATH = os.environ.get('KABOOOM_CPP_LIB', os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'kabooom_cpp', 'build', 'lib', 'libkabooom_c.so')))
+
+_library = None
+
+
+def load_library() -> ctypes.CDLL:
+
+    # Loaded on first use so that importing this module never needs the build
+    global _library
+    if _library is None:
+        if not os.path.exists(LIBRARY_PATH):
+            raise OSError(f"{LIBRARY_PATH} not found; build kabooom_cpp (see README) "
+                          f"or set KABOOOM_CPP_LIB to libkabooom_c.so.")
+        library = ctypes.CDLL(LIBRARY_PATH)
+        library.kabooom_bfs.restype = ctypes.c_int64
+        library.kabooom_bfs.argtypes = [
+            np.ctypeslib.ndpointer(np.uint8, ndim=2, flags='C_CONTIGUOUS'), ctypes.c_int64, ctypes.c_int64,
+            ctypes.c_int64, ctypes.c_int64,
+            np.ctypeslib.ndpointer(np.int64, ndim=2, flags='C_CONTIGUOUS'), ctypes.c_int64,
+            np.ctypeslib.ndpointer(np.int64, ndim=2, flags='C_CONTIGUOUS,WRITEABLE')]
+        _library = library
+    return _library
+
+
+@timed
+def cpp_bfs(start_point: tuple, trajectory: tuple, occupancy_map: Map,
+            on_expand=None, on_push=None) -> SearchResult:
+
+    # Native state-based BFS from kabooom_cpp. The grid and trajectory
+    # buffers are handed over by pointer; NumPy only copies them when they
+    # are not already C-contiguous uint8 / int64. The native search reports
+    # no counters and cannot call back into Python, so callbacks and
+    # time-varying overrides go to fox_traversals.bfs instead.
+    if on_expand is not None or on_push is not None or occupancy_map.overrides:
+        return fox_traversals.bfs(start_point, trajectory, occupancy_map,
+                                  on_expand=on_expand, on_push=on_push)
+    if not occupancy_map.interception_possible(start_point, trajectory):
+        return SearchResult()
+
+    library = load_library()
+    grid = np.ascontiguousarray(occupancy_map.grid, dtype=np.uint8)
+    targets = np.ascontiguousarray(np.asarray(trajectory, dtype=np.int64).reshape(-1, 2))
+    path = np.empty_like(targets)
+    length = library.kabooom_bfs(grid, grid.shape[0], grid.shape[1],
+                                 int(start_point[0]), int(start_point[1]),
+                                 targets, len(targets), path)
+
+    if not length:
+        return SearchResult()
+    return SearchResult(path=path[:length].tolist())
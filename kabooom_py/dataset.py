@@ -0,0 +1,147 @@
+import argparse
+import os
+from dataclasses import dataclass
+from grid import Map
+from main import ALGORITHMS, generate_scenario, scenario_seeds
+import random
+import numpy as np
+
+
+# A shard is one compressed .npz holding scenarios that share a grid shape.
+# Ragged trajectories and paths are concatenated, with offsets per scenario.
+NO_INTERCEPTION = -1
+
+
+@dataclass
+class Scenario:
+    grid: np.ndarray
+    start: tuple
+    trajectory: tuple
+    resolution: float = 0.1
+    seed: int = None
+    interception_time: int = None
+    path: list = None
+
+    def to_map(self) -> Map:
+        occupancy_map = Map.from_grid(self.grid, self.resolution)
+        occupancy_map.trajectory = [list(point) for point in self.trajectory]
+        return occupancy_map
+
+
+def write_shard(path: str, scenarios: list, algorithm: str = None) -> None:
+
+    # Ground truth is stored when the solver that produced it is named
+    arrays = {'grids': np.stack([scenario.grid for scenario in scenarios]).astype(np.uint8),
+              'resolution': np.float64(scenarios[0].resolution),
+              'seeds': np.array([-1 if scenario.seed is None else scenario.seed for scenario in scenarios],
+                                dtype=np.int64),
+              'starts': np.array([scenario.start for scenario in scenarios], dtype=np.int64).reshape(-1, 2)}
+    arrays['trajectory_offsets'], arrays['trajectories'] = _concatenate(
+        [scenario.trajectory for scenario in scenarios])
+
+    if algorithm is not None:
+        arrays['algorithm'] = np.array(algorithm)
+        arrays['interception_times'] = np.array(
+            [NO_INTERCEPTION if scenario.path is None else scenario.interception_time for scenario in scenarios],
+            dtype=np.int64)
+        arrays['path_offsets'], arrays['paths'] = _concatenate(
+            [scenario.path or [] for scenario in scenarios])
+
+    np.savez_compressed(path, **arrays)
+
+
+def read_shard(path: str) -> tuple:
+
+    # Returns (scenarios, algorithm) where algorithm names the solver behind
+    # the cached ground truth, or None when the shard has not been solved
+    with np.load(path) as shard:
+        trajectories = _split(shard['trajectory_offsets'], shard['trajectories'])
+        algorithm = str(shard['algorithm']) if 'algorithm' in shard else None
+        if algorithm is not None:
+            paths = _split(shard['path_offsets'], shard['paths'])
+            times = shard['interception_times'].tolist()
+
+        scenarios = []
+        for i, grid in enumerate(shard['grids']):
+            scenario = Scenario(grid, tuple(shard['starts'][i].tolist()),
+                                tuple(map(tuple, trajectories[i].tolist())), float(shard['resolution']),
+                                None if shard['seeds'][i] < 0 else int(shard['seeds'][i]))
+            if algorithm is not None and times[i] != NO_INTERCEPTION:
+                scenario.interception_time, scenario.path = times[i], paths[i].tolist()
+            scenarios.append(scenario)
+
+    return scenarios, algorithm
+
+
+def generate_shard(path: str, args, count: int, seed: int) -> list:
+
+    # Scenario i is generated exactly as main.py would with the same master seed
+    scenarios = []
+    for scenario_seed in scenario_seeds(seed, count):
+        random.seed(scenario_seed)
+        dummy_map, start, tuple_of_trajs = generate_scenario(
+            args, np.random.default_rng(scenario_seed))
+        scenarios.append(Scenario(dummy_map.grid.copy(), tuple(start), tuple_of_trajs,
+                                  args.map_resolution, scenario_seed))
+
+    write_shard(path, scenarios)
+    return scenarios
+
+
+def solve_shard(path: str, algorithm: str = 'wavefront') -> list:
+
+    # Ground truth is computed once per shard and algorithm, then replayed
+    scenarios, solved_with = read_shard(path)
+    if solved_with == algorithm:
+        return scenarios
+
+    solver = ALGORITHMS[algorithm]
+    for scenario in scenarios:
+        search = solver(scenario.start, scenario.trajectory, scenario.to_map())
+        scenario.path, scenario.interception_time = search.path, search.interception_time
+
+    write_shard(path, scenarios, algorithm)
+    return scenarios
+
+
+def _concatenate(sequences: list) -> tuple:
+
+    lengths = [len(sequence) for sequence in sequences]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    values = np.concatenate([np.asarray(sequence, dtype=np.int64).reshape(-1, 2) for sequence in sequences]) \
+        if sequences else np.zeros((0, 2), dtype=np.int64)
+    return offsets, values
+
+
+def _split(offsets: np.ndarray, values: np.ndarray) -> list:
+
+    return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Generate scenario shards and cache their ground-truth solutions.")
+    parser.add_argument('shard', type=str, help="Path of the .npz shard.")
+    parser.add_argument('--count', type=int, default=100,
+                        help="Number of scenarios to generate when the shard does not exist yet.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Master seed for scenario generation.")
+    parser.add_argument('--circle', action='store_true',
+                        help="Whether to draw a circular trajectory or not.")
+    parser.add_argument('--num_obstacles', type=int, default=20,
+                        help="Number of obstacles to add to the map.")
+    parser.add_argument('--map_width', type=int, default=5,
+                        help="Width of the map.")
+    parser.add_argument('--map_height', type=int,
+                        default=5, help="Height of the map.")
+    parser.add_argument('--map_resolution', type=float,
+                        default=0.1, help="Resolution of the map.")
+    parser.add_argument('--algorithm', type=str, default='wavefront', choices=list(ALGORITHMS),
+                        help="Solver used for the cached ground truth.")
+
+    args = parser.parse_args()
+    if not os.path.exists(args.shard):
+        generate_shard(args.shard, args, args.count, args.seed)
+    scenarios = solve_shard(args.shard, args.algorithm)
+    print(f"{args.shard}: {len(scenarios)} scenarios, "
+          f"{sum(scenario.path is not None for scenario in scenarios)} interceptions ({args.algorithm})")
@@ -1,103 +1,275 @@
+from bisect import bisect_left
 from collections import deque
-from grid import Map
+from grid import Map, Adjacency, EIGHT_CONNECTED
+from search_result import SearchResult, timed
 import numpy as np
 from collections import deque
 import heapq
 
 
-def dijkstra(start_point: tuple, trajectory: tuple, occupancy_map: 'Map'):
+# Parent layers hold, per time step, the index of the movement direction that
+# first reached each cell. UNVISITED doubles as the visited bitmap.
+UNVISITED = np.iinfo(np.uint8).max
+START = UNVISITED - 1
 
-    start = (start_point[0], start_point[1], trajectory[0], trajectory[1], 0)
-    available_directions = np.array(
-        [[0, 1], [1, 0], [0, -1], [-1, 0], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+
+@timed
+def dijkstra(start_point: tuple, trajectory: tuple, occupancy_map: 'Map', movement_directions: np.ndarray = EIGHT_CONNECTED,
+             on_expand=None, on_push=None) -> SearchResult:
+
+    if not occupancy_map.interception_possible(start_point, trajectory):
+        return SearchResult()
+
+    adjacency = occupancy_map.get_adjacency(movement_directions)
+    overrides = occupancy_map.overrides or None
+    cols = occupancy_map.grid.shape[1]
+    targets = flatten_trajectory(trajectory, occupancy_map.grid.shape)
+    start = (0, start_point[0] * cols + start_point[1])
     queue = []
     heapq.heappush(queue, (0, start))
-    visited = set()
-    previous = {start: None}
-    cost = {start: 0}
+    parents = []
+    get_parent_layer(parents, 0, occupancy_map)[start[1]] = START
+    result = SearchResult(pushes=1, visited=1, max_open=1)
 
     while queue:
         current_cost, current_node = heapq.heappop(queue)
+        current_time, cell = current_node
+        result.expanded += 1
+        if on_expand is not None:
+            on_expand(current_time, cell)
+
+        if cell == targets[current_time]:
+            result.path = backtrack(current_node, parents, adjacency, cols)
+            result.interception_time = current_time
+            return result
+
+        next_time = current_time + 1
+        if next_time >= len(targets):
+            continue
+
+        next_layer = get_parent_layer(parents, next_time, occupancy_map)
+
+        for neighbour, direction in get_neighbours(cell, adjacency):
+            # Time-varying occupancy is checked at the time the move lands
+            if overrides and overrides.is_blocked(next_time, neighbour):
+                continue
+            if next_layer[neighbour] == UNVISITED:
+                # Dijkstra's distance update step
+                # assuming control action takes a unit time, every path to a
+                # (x, y, t) state costs t, so the first relaxation is final
+                next_layer[neighbour] = direction
+                heapq.heappush(
+                    queue, (current_cost + 1, (next_time, neighbour)))
+                result.pushes += 1
+                result.visited += 1
+                if on_push is not None:
+                    on_push(next_time, neighbour)
+            else:
+                result.duplicates += 1
+        result.max_open = max(result.max_open, len(queue))
+
+    return result
+
+
+@timed
+def astar(start_point: tuple, trajectory: tuple, occupancy_map: Map, movement_directions: np.ndarray = EIGHT_CONNECTED,
+          on_expand=None, on_push=None) -> SearchResult:
+
+    if not occupancy_map.interception_possible(start_point, trajectory):
+        return SearchResult()
+
+    adjacency = occupancy_map.get_adjacency(movement_directions)
+    overrides = occupancy_map.overrides or None
+    cols = occupancy_map.grid.shape[1]
+    targets = flatten_trajectory(trajectory, occupancy_map.grid.shape)
+    heuristic = interception_heuristic(trajectory, occupancy_map)
+    start = (0, start_point[0] * cols + start_point[1])
+    start_estimate = heuristic(start[1], 0)
+    if start_estimate is None:
+        return SearchResult()
 
-        if current_node[0] == current_node[2] and current_node[1] == current_node[3]:
-            return backtrack(current_node, previous)
+    # Ties on t + h are broken towards later time steps
+    queue = []
+    heapq.heappush(queue, (start_estimate, 0, start[1]))
+    # A guided search touches few states per time step, so its parent
+    # layers are dicts from cell to direction rather than dense arrays
+    parents = [{start[1]: START}]
+    result = SearchResult(pushes=1, visited=1, max_open=1)
+
+    while queue:
+        _, negative_time, cell = heapq.heappop(queue)
+        current_time = -negative_time
+        result.expanded += 1
+        if on_expand is not None:
+            on_expand(current_time, cell)
+
+        if cell == targets[current_time]:
+            result.path = backtrack(
+                (current_time, cell), parents, adjacency, cols)
+            result.interception_time = current_time
+            return result
 
-        if current_node in visited:
+        next_time = current_time + 1
+        if next_time >= len(targets):
             continue
 
-        visited.add(current_node)
+        if len(parents) <= next_time:
+            parents.append({})
+        next_layer = parents[next_time]
+
+        for neighbour, direction in get_neighbours(cell, adjacency):
+            if overrides and overrides.is_blocked(next_time, neighbour):
+                continue
+            if neighbour not in next_layer:
+                # Every path to a state costs t and the heuristic is
+                # consistent, so states never need to be reopened
+                next_layer[neighbour] = direction
+                result.visited += 1
+                estimate = heuristic(neighbour, next_time)
+                if estimate is not None:
+                    heapq.heappush(
+                        queue, (next_time + estimate, -next_time, neighbour))
+                    result.pushes += 1
+                    if on_push is not None:
+                        on_push(next_time, neighbour)
+            else:
+                result.duplicates += 1
+        result.max_open = max(result.max_open, len(queue))
+
+    return result
+
 
-        for neighbour in get_neighbours(current_node, available_directions):
-            if is_feasible(neighbour, occupancy_map):
-                current_time = current_node[-1] + 1
+def interception_heuristic(trajectory: tuple, occupancy_map: Map):
 
-                if current_time < len(trajectory) and neighbour not in visited:
-                    next_node = (neighbour[0], neighbour[1], trajectory[current_time]
-                                 [0], trajectory[current_time][1], current_time)
+    # Lower bound on the time left before interception, ignoring obstacles:
+    # the target can only be met at t' if cheb(ego, target(t')) <= t' - t,
+    # i.e. t' + px >= t + x, t' - px >= t - x, t' + py >= t + y and
+    # t' - py >= t - y. Running maxima of those four sequences are computed
+    # once per trajectory, so the earliest t' is a bisection in each and the
+    # bound costs O(T) memory whatever the number of cells visited. It is
+    # exact while the target moves at most one cell per step (the sequences
+    # are then already non-decreasing) and a looser, still consistent, bound
+    # otherwise.
+    points = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+    rows, cols = occupancy_map.grid.shape
+    times = np.arange(len(points))
+    inside = (0 <= points[:, 0]) & (points[:, 0] < rows) & \
+        (0 <= points[:, 1]) & (points[:, 1] < cols)
+    # Past the start the ego can only stand on free cells
+    reachable = inside.copy()
+    reachable[1:] &= occupancy_map.grid[np.where(inside, points[:, 0], 0),
+                                        np.where(inside, points[:, 1], 0)][1:] == 0
+    bounds = [np.maximum.accumulate(times + sign * points[:, axis]).tolist()
+              for axis in (0, 1) for sign in (1, -1)]
+    # next_reachable[t'] is the first reachable time step at or after t'
+    next_reachable = np.append(np.minimum.accumulate(
+        np.where(reachable, times, len(points))[::-1])[::-1], len(points)).tolist()
 
-                    # Dijkstra's distance update step
-                    # assuming control action takes a unit time
-                    new_cost = cost[current_node] + 1
+    def heuristic(cell: int, time_step: int):
+        x, y = divmod(cell, cols)
+        # The running maxima can meet all four thresholds before time_step,
+        # which the raw sequences cannot, so the search starts there
+        arrival = next_reachable[max(time_step,
+                                     bisect_left(bounds[0], time_step + x), bisect_left(bounds[1], time_step - x),
+                                     bisect_left(bounds[2], time_step + y), bisect_left(bounds[3], time_step - y))]
+        if arrival == len(points):
+            return None
+        return arrival - time_step
 
-                    if new_cost < cost.get(next_node, float('inf')):
-                        cost[next_node] = new_cost
-                        previous[next_node] = current_node
-                        heapq.heappush(queue, (new_cost, next_node))
+    return heuristic
 
-    return None
 
+@timed
+def bfs(start_point: tuple, trajectory: tuple, occupancy_map: Map, movement_directions: np.ndarray = EIGHT_CONNECTED,
+        on_expand=None, on_push=None) -> SearchResult:
 
-def bfs(start_point: tuple, trajectory: tuple, occupancy_map: Map):
+    if not occupancy_map.interception_possible(start_point, trajectory):
+        return SearchResult()
 
-    start = (start_point[0], start_point[1], trajectory[0], trajectory[1], 0)
-    available_directions = np.array(
-        [[0, 1], [1, 0], [0, -1], [-1, 0], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+    adjacency = occupancy_map.get_adjacency(movement_directions)
+    overrides = occupancy_map.overrides or None
+    cols = occupancy_map.grid.shape[1]
+    targets = flatten_trajectory(trajectory, occupancy_map.grid.shape)
+    start = (0, start_point[0] * cols + start_point[1])
     queue = deque()
     queue.append(start)
-    visited = set()
-    previous = {start: None}
+    parents = []
+    get_parent_layer(parents, 0, occupancy_map)[start[1]] = START
+    result = SearchResult(pushes=1, visited=1, max_open=1)
 
     while queue:
         current_node = queue.popleft()
-        if current_node[0] == current_node[2] and current_node[1] == current_node[3]:
-            return backtrack(current_node, previous)
-        if current_node in visited:
+        current_time, cell = current_node
+        result.expanded += 1
+        if on_expand is not None:
+            on_expand(current_time, cell)
+        if cell == targets[current_time]:
+            result.path = backtrack(current_node, parents, adjacency, cols)
+            result.interception_time = current_time
+            return result
+        next_time = current_time + 1
+        if next_time >= len(targets):
             continue
-        visited.add(current_node)
-        for neighbour in get_neighbours(current_node, available_directions):
-            if is_feasible(neighbour, occupancy_map):
-                current_time = current_node[-1] + 1
-                if current_time < len(trajectory) and neighbour not in visited:
-                    next_node = (neighbour[0], neighbour[1], trajectory[current_time]
-                                 [0], trajectory[current_time][1], current_time)
-                    previous[next_node] = current_node
-                    queue.append(next_node)
+        next_layer = get_parent_layer(parents, next_time, occupancy_map)
+        for neighbour, direction in get_neighbours(cell, adjacency):
+            if overrides and overrides.is_blocked(next_time, neighbour):
+                continue
+            if next_layer[neighbour] == UNVISITED:
+                next_layer[neighbour] = direction
+                queue.append((next_time, neighbour))
+                result.pushes += 1
+                result.visited += 1
+                if on_push is not None:
+                    on_push(next_time, neighbour)
+            else:
+                result.duplicates += 1
+        result.max_open = max(result.max_open, len(queue))
+
+    return result
+
+
+def get_parent_layer(parents: list, time_step: int, occupancy_map: Map) -> np.ndarray:
+
+    # Layers are allocated the first time the search reaches a time step
+    while len(parents) <= time_step:
+        parents.append(np.full(occupancy_map.grid.size,
+                       UNVISITED, dtype=np.uint8))
+    return parents[time_step]
+
+
+def flatten_trajectory(trajectory: tuple, shape: tuple) -> list:
 
-    return None
+    # Flat cell index of the target at every time step, -1 when it is off the map
+    points = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+    inside = (0 <= points[:, 0]) & (points[:, 0] < shape[0]) & \
+        (0 <= points[:, 1]) & (points[:, 1] < shape[1])
+    return np.where(inside, points[:, 0] * shape[1] + points[:, 1], -1).tolist()
 
 
-def get_neighbours(vertex: tuple, movement_directions: np.ndarray = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]])) -> tuple:
+def get_neighbours(cell: int, adjacency: Adjacency) -> zip:
 
-    neighbours = np.array([[vertex[0], vertex[1]]] *
-                          len(movement_directions)) + movement_directions
-    return [tuple(neighbour) for neighbour in neighbours]
+    # Free, in-bounds neighbours come straight from the map's cached table
+    return adjacency.neighbours(cell)
 
-# Free space and bound check
+# Free space and bound check, at time_step when one is given
 
 
-def is_feasible(neighbour: np.ndarray, occupancy_map: Map) -> bool:
+def is_feasible(neighbour: np.ndarray, occupancy_map: Map, time_step: int = None) -> bool:
 
-    x, y = neighbour[0], neighbour[1]
-    return (0 <= x < occupancy_map.grid.shape[0]) and (0 <= y < occupancy_map.grid.shape[1]) and (occupancy_map.grid[x, y] == 0)
+    return occupancy_map.is_free(int(neighbour[0]), int(neighbour[1]), time_step)
 
 
-def backtrack(current_node: tuple, previous: dict[tuple:float]) -> np.ndarray:
+def backtrack(current_node: tuple, parents: list, adjacency: Adjacency, cols: int) -> list:
 
-    path = []
+    # parents[t][cell] is the direction code that reached cell at t, from a
+    # dense layer or, for astar, a dict
+    time_step, cell = current_node
+    offsets = adjacency.movement_directions @ np.array([cols, 1])
+    path = [list(divmod(int(cell), cols))]
 
-    while current_node:
-        grid_path = [current_node[0], current_node[1]]
-        path.append(grid_path)
-        current_node = previous[current_node]
+    while time_step > 0:
+        cell -= int(offsets[parents[time_step][cell]])
+        time_step -= 1
+        path.append(list(divmod(cell, cols)))
 
     return path[::-1]
@@ -0,0 +1,91 @@
+from grid import Map, MapState
+import numpy as np
+
+
+# RGB colours indexed by MapState value, matching Map.colors
+# ('white', 'black', 'red', 'blue') without going through matplotlib
+PALETTE = np.zeros((len(MapState), 3), dtype=np.uint8)
+PALETTE[MapState.FREE.value] = (255, 255, 255)
+PALETTE[MapState.OCCUPIED.value] = (0, 0, 0)
+PALETTE[MapState.TARGET_STATE.value] = (255, 0, 0)
+PALETTE[MapState.EGO_STATE.value] = (0, 0, 255)
+
+
+def render_frame(grid: np.ndarray, path: list = (), trajectory: list = (), scale: int = 1) -> np.ndarray:
+
+    # (rows * scale, cols * scale, 3) uint8 image of the grid with every
+    # given path and trajectory cell drawn; the target wins where they overlap.
+    # A None path (no interception) draws nothing.
+    states = grid.copy()
+    for points, state in ((path, MapState.EGO_STATE), (trajectory, MapState.TARGET_STATE)):
+        points = np.asarray(_points(points), dtype=np.int64).reshape(-1, 2)
+        points = points[_inside(points, states.shape)]
+        states[points[:, 0], points[:, 1]] = state.value
+    return _colour(states, scale)
+
+
+def render_episode(occupancy_map: Map, path: list, scale: int = 1) -> np.ndarray:
+
+    # (steps, rows * scale, cols * scale, 3) stack with frame t showing the
+    # ego at path[t] and the target at trajectory[t], as Map.simulate does.
+    # Without an interception (path None) the whole trajectory is played
+    # with no ego.
+    path = _points(path)
+    steps = len(occupancy_map.trajectory) if not len(path) else min(len(path), len(occupancy_map.trajectory))
+    states = np.repeat(occupancy_map.grid[np.newaxis], steps, axis=0)
+    time_steps = np.arange(steps)
+    for points, state in ((path, MapState.EGO_STATE), (occupancy_map.trajectory, MapState.TARGET_STATE)):
+        points = np.asarray(points[:steps], dtype=np.int64).reshape(-1, 2)
+        inside = _inside(points, states.shape[1:])
+        states[time_steps[inside], points[inside, 0], points[inside, 1]] = state.value
+    return _colour(states, scale)
+
+
+def render_thumbnails(grids: np.ndarray, paths: list, trajectories: list, scale: int = 1) -> np.ndarray:
+
+    # (batch, rows * scale, cols * scale, 3) stills of many same-shaped
+    # scenarios, with all overlays painted in one indexing call per kind.
+    # Scenarios without an interception have a None path and no ego overlay.
+    states = np.array(grids, dtype=np.uint8)
+    for batch_points, state in ((paths, MapState.EGO_STATE), (trajectories, MapState.TARGET_STATE)):
+        batch_points = [_points(points) for points in batch_points]
+        lengths = [len(points) for points in batch_points]
+        if not sum(lengths):
+            continue
+        scenarios = np.repeat(np.arange(len(batch_points)), lengths)
+        points = np.concatenate([np.asarray(points, dtype=np.int64).reshape(-1, 2)
+                                 for points in batch_points])
+        inside = _inside(points, states.shape[1:])
+        states[scenarios[inside], points[inside, 0], points[inside, 1]] = state.value
+    return _colour(states, scale)
+
+
+def tile(frames: np.ndarray, columns: int, padding: int = 1) -> np.ndarray:
+
+    # Lays (n, h, w, 3) frames out row-major on a black sheet, e.g. to turn
+    # render_thumbnails output or an episode into a single strip image
+    n, height, width = frames.shape[:3]
+    rows = -(-n // columns)
+    sheet = np.zeros((rows, columns, height + padding, width + padding, 3), dtype=np.uint8)
+    sheet.reshape(rows * columns, height + padding, width + padding, 3)[:n, :height, :width] = frames
+    sheet = sheet.transpose(0, 2, 1, 3, 4).reshape(rows * (height + padding), columns * (width + padding), 3)
+    return sheet[:-padding or None, :-padding or None]
+
+
+def _points(points) -> list:
+
+    return () if points is None else points
+
+
+def _inside(points: np.ndarray, shape: tuple) -> np.ndarray:
+
+    return (0 <= points[:, 0]) & (points[:, 0] < shape[0]) & \
+        (0 <= points[:, 1]) & (points[:, 1] < shape[1])
+
+
+def _colour(states: np.ndarray, scale: int) -> np.ndarray:
+
+    # Palette lookup, then nearest-neighbour upscaling by index repetition
+    if scale > 1:
+        states = states.repeat(scale, axis=-2).repeat(scale, axis=-1)
+    return PALETTE[states]
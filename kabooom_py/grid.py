@@ -1,10 +1,11 @@
 import numpy as np
+from dataclasses import dataclass
 from enum import Enum
+from occupancy import Overrides
+import bitset
+import hashlib
 import random
 import math
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-from matplotlib.patches import Patch
 
 
 class MapState(Enum):
@@ -14,6 +15,30 @@ class MapState(Enum):
     EGO_STATE = 3
 
 
+# Eight-connected motion stencil shared by the search engines
+EIGHT_CONNECTED = np.array(
+    [[0, 1], [1, 0], [0, -1], [-1, 0], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+# The same stencil with an extra "stay in place" action
+EIGHT_CONNECTED_HOVER = np.vstack((EIGHT_CONNECTED, [[0, 0]]))
+# Cells per block when building neighbour tables
+ADJACENCY_CHUNK = 1 << 18
+
+
+@dataclass
+class Adjacency:
+    # CSR neighbour table over flattened cell indices (x * cell_y + y). The
+    # neighbours of a cell are indices[indptr[cell]:indptr[cell + 1]] and
+    # directions holds the stencil row each edge was generated from.
+    indptr: np.ndarray
+    indices: np.ndarray
+    directions: np.ndarray
+    movement_directions: np.ndarray
+
+    def neighbours(self, cell: int) -> zip:
+        lo, hi = self.indptr[cell], self.indptr[cell + 1]
+        return zip(self.indices[lo:hi].tolist(), self.directions[lo:hi].tolist())
+
+
 class Map:
 
     def __init__(self, resolution=0.1, width=5, height=5, obstacle_scale=[0.1, 0.25]) -> None:
@@ -27,10 +52,38 @@ class Map:
         self.max_circle_radius = 0.5 * min(self.width, self.height)
         self.cell_x = int(self.width/self.resolution)
         self.cell_y = int(self.height/self.resolution)
-        self.grid = np.zeros((self.cell_x, self.cell_y))
+        self.grid = np.zeros((self.cell_x, self.cell_y), dtype=np.uint8)
         self.trajectory = None
+        # Time-indexed blockages on top of grid, e.g. no-fly windows and
+        # moving hazards; grid alone describes every time step when empty
+        self.overrides = Overrides(self.grid.shape)
         self.colors = ['white', 'black', 'red', 'blue']
-        self.cmap = mcolors.ListedColormap(self.colors)
+
+    @classmethod
+    def from_grid(cls, grid: np.ndarray, resolution: float = 0.1, obstacle_scale=[0.1, 0.25]) -> 'Map':
+
+        # Map around an existing occupancy grid, e.g. one read back from disk
+        occupancy_map = cls(resolution, grid.shape[0] * resolution,
+                            grid.shape[1] * resolution, obstacle_scale)
+        occupancy_map.cell_x, occupancy_map.cell_y = grid.shape
+        occupancy_map.grid = np.array(grid, dtype=np.uint8)
+        occupancy_map.overrides = Overrides(occupancy_map.grid.shape)
+        return occupancy_map
+
+    @property
+    def grid(self) -> np.ndarray:
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid: np.ndarray) -> None:
+        self._grid = grid
+        self.invalidate()
+
+    def invalidate(self) -> None:
+
+        # Drops the structures derived from grid. Assigning a new grid does
+        # this already; call it after editing grid in place.
+        self._cache = {}
 
     def _add_obstacle(self, start: list[int]) -> None:
 
@@ -43,6 +96,7 @@ class Map:
 
         self.grid[start_idx_x:min(self.cell_x, int(start_idx_x+width/self.resolution)),
                   start_idx_y:min(self.cell_y, int(start_idx_y+height/self.resolution))] = 1
+        self.invalidate()
 
     def add_n_obstacles(self, n: int = 5) -> None:
 
@@ -51,6 +105,31 @@ class Map:
                          1), round(random.random()*self.height, 1)
             self._add_obstacle([x, y])
 
+    def add_random_obstacles(self, n: int, rng: np.random.Generator) -> None:
+
+        # Vectorised, seeded counterpart of add_n_obstacles
+        self.grid[self.generate_obstacle_grids(1, n, rng)[0]] = MapState.OCCUPIED.value
+        self.invalidate()
+
+    def generate_obstacle_grids(self, batch: int, n: int, rng: np.random.Generator) -> np.ndarray:
+
+        # (batch, cell_x, cell_y) boolean obstacle masks with n rectangles
+        # each, drawn from the same distribution as add_n_obstacles
+        size = (batch, n)
+        x = np.round(rng.random(size) * self.width, 1)
+        y = np.round(rng.random(size) * self.height, 1)
+        width = np.maximum(self.min_obstacle_width,
+                           rng.random(size) * self.max_obstacle_width)
+        height = np.maximum(self.min_obstacle_height,
+                            rng.random(size) * self.max_obstacle_height)
+
+        x0 = np.minimum(self.cell_x, (x / self.resolution).astype(np.int64))
+        y0 = np.minimum(self.cell_y, (y / self.resolution).astype(np.int64))
+        x1 = np.minimum(self.cell_x, (x0 + width / self.resolution).astype(np.int64))
+        y1 = np.minimum(self.cell_y, (y0 + height / self.resolution).astype(np.int64))
+
+        return paint_rectangles((batch, self.cell_x, self.cell_y), x0, x1, y0, y1)
+
     def get_wall_trajectory(self) -> np.ndarray:
 
         forward = [[i, 0] for i in range(
@@ -71,43 +150,185 @@ class Map:
         self.trajectory = (forward + forward[::-1])
         return self.trajectory
     
-    def simulate(self, path: list) -> None:
-        if not path:
-            print(f"No interception possible!")
-            return
-
-        for idx, point in enumerate(path[:len(self.trajectory)]):
-            if 0 <= point[0] < self.grid.shape[0] and 0 <= point[1] < self.grid.shape[1]:
-                self.grid[point[0], point[1]] = MapState.EGO_STATE.value
-
-            if idx < len(self.trajectory) and 0 <= self.trajectory[idx][0] < self.grid.shape[0] and 0 <= self.trajectory[idx][1] < self.grid.shape[1]:
-                self.grid[self.trajectory[idx][0], self.trajectory[idx]
-                          [1]] = MapState.TARGET_STATE.value
-
-            ego_patch = Patch(color=self.cmap(
-                MapState.EGO_STATE.value), label='Ego')
-            target_patch = Patch(color=self.cmap(
-                MapState.TARGET_STATE.value), label='Target')
-            free_patch = Patch(color=self.cmap(
-                MapState.FREE.value), label='Free')
-            obstacle_patch = Patch(color=self.cmap(
-                MapState.OCCUPIED.value), label='Occupied')
-
-            plt.legend(handles=[ego_patch, target_patch, free_patch,
-                       obstacle_patch], loc='upper left', bbox_to_anchor=(1.05, 1))
-            plt.imshow(self.grid, cmap=self.cmap)
-            plt.title('Simulation Time Step: {}'.format(idx))
-            plt.xlabel('X Coordinate')
-            plt.ylabel('Y Coordinate')
-            plt.pause(0.1)
-
-            if 0 <= point[0] < self.grid.shape[0] and 0 <= point[1] < self.grid.shape[1]:
-                self.grid[point[0], point[1]] = MapState.FREE.value
-
-            if idx < len(self.trajectory) and 0 <= self.trajectory[idx][0] < self.grid.shape[0] and 0 <= self.trajectory[idx][1] < self.grid.shape[1]:
-                self.grid[self.trajectory[idx][0],
-                          self.trajectory[idx][1]] = MapState.FREE.value
+    @property
+    def cmap(self):
+        import matplotlib.colors as mcolors
+        return mcolors.ListedColormap(self.colors)
+
+    # Rendering lives in render.py so that matplotlib is only imported when
+    # something is actually drawn
+
+    def simulate(self, path: list, interval: int = 100) -> None:
+        from render import simulate
+        simulate(self, path, interval)
+
+    def export(self, path: list, filename: str, fps: int = 10) -> None:
+        from render import export
+        export(self, path, filename, fps)
 
     def visualize(self) -> None:
-        plt.imshow(self.grid)
-        plt.show()
+        from render import visualize
+        visualize(self)
+
+    def get_adjacency(self, movement_directions: np.ndarray = EIGHT_CONNECTED) -> Adjacency:
+
+        key = ('adjacency', np.asarray(movement_directions).tobytes())
+        return self._cached(key, lambda free: build_adjacency(free, movement_directions))
+
+    def get_packed_free(self) -> np.ndarray:
+
+        # Free space as one bit per cell in uint64 words, see bitset
+        return self._cached(('packed_free',), bitset.pack)
+
+    def is_free(self, x: int, y: int, time_step: int = None) -> bool:
+
+        # In bounds and free in the static grid and, when a time step is
+        # given, not blocked by an override at that time
+        if not (0 <= x < self.grid.shape[0] and 0 <= y < self.grid.shape[1]) or self.grid[x, y] != 0:
+            return False
+        return time_step is None or not self.overrides.is_blocked(time_step, x * self.grid.shape[1] + y)
+
+    def free_at(self, time_step: int) -> np.ndarray:
+
+        free = self.grid == 0
+        free.ravel()[self.overrides.blocked_at(time_step)] = False
+        return free
+
+    def get_packed_free_at(self, time_step: int) -> np.ndarray:
+
+        # get_packed_free with the cells blocked at time_step cleared; the
+        # cached static words are returned as is when nothing is blocked
+        free_words = self.get_packed_free()
+        blocked = self.overrides.blocked_at(time_step)
+        if not blocked.size:
+            return free_words
+        xs, ys = np.divmod(blocked, self.grid.shape[1])
+        free_words = free_words.copy()
+        np.bitwise_and.at(free_words, (xs, ys >> 6), ~(np.uint64(1) << (ys & 63).astype(np.uint64)))
+        return free_words
+
+    def get_components(self) -> np.ndarray:
+
+        # Label of the 8-connected free-space component of every cell, -1 on obstacles
+        return self._cached(('components',), label_components)
+
+    def content_hash(self) -> str:
+
+        # Identifies the occupancy layout (shape and cell values), e.g. to
+        # refer to an uploaded map or key cached solutions
+        digest = hashlib.sha256(np.array(self.grid.shape, dtype=np.int64).tobytes())
+        digest.update(np.ascontiguousarray(self.grid, dtype=np.uint8).tobytes())
+        return digest.hexdigest()
+
+    def interception_possible(self, start: tuple, trajectory: tuple) -> bool:
+
+        # Necessary conditions only: some target position must lie in the
+        # start's component and within Chebyshev reach, cheb(start, target(t)) <= t
+        points = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+        if len(points) and tuple(points[0]) == (start[0], start[1]):
+            return True
+
+        labels = self.get_components()
+        # An ego starting on an obstacle leaves it with its first move, into
+        # any free cell of the 3x3 block around it
+        start_labels = labels[max(start[0] - 1, 0):start[0] + 2, max(start[1] - 1, 0):start[1] + 2].ravel() \
+            if labels[start[0], start[1]] < 0 else [labels[start[0], start[1]]]
+
+        times = np.arange(len(points))
+        inside = (0 <= points[:, 0]) & (points[:, 0] < self.grid.shape[0]) & \
+            (0 <= points[:, 1]) & (points[:, 1] < self.grid.shape[1])
+        target_labels = labels[np.where(inside, points[:, 0], 0),
+                               np.where(inside, points[:, 1], 0)]
+        distance = np.maximum(
+            np.abs(points[:, 0] - start[0]), np.abs(points[:, 1] - start[1]))
+
+        return bool(np.any(inside & (target_labels >= 0) & np.isin(target_labels, start_labels)
+                           & (distance <= times)))
+
+    def _cached(self, key, build):
+
+        # Derived structures are built from the free-space layout on first
+        # use and kept until the grid is replaced or invalidate() is called
+        if key not in self._cache:
+            self._cache[key] = build(self.grid == 0)
+        return self._cache[key]
+
+
+def build_adjacency(free: np.ndarray, movement_directions: np.ndarray = EIGHT_CONNECTED) -> Adjacency:
+
+    # Built ADJACENCY_CHUNK cells at a time so that the (cells, directions)
+    # temporaries stay small next to the table itself
+    rows, cols = free.shape
+    movement_directions = np.asarray(movement_directions)
+    steps = movement_directions.astype(np.int32)
+    chunk_rows = max(1, ADJACENCY_CHUNK // cols)
+    indices, directions, counts = [], [], []
+
+    for row in range(0, rows, chunk_rows):
+        xs, ys = np.indices((min(chunk_rows, rows - row), cols), dtype=np.int32).reshape(2, -1)
+        nx = xs[:, None] + (steps[:, 0] + row)
+        ny = ys[:, None] + steps[:, 1]
+
+        valid = (0 <= nx) & (nx < rows) & (0 <= ny) & (ny < cols)
+        valid[valid] = free[nx[valid], ny[valid]]
+
+        indices.append((nx[valid] * cols + ny[valid]).astype(np.int32))
+        directions.append(np.broadcast_to(
+            np.arange(len(movement_directions), dtype=np.uint8), valid.shape)[valid])
+        counts.append(valid.sum(axis=1))
+
+    indptr = np.concatenate(([0], np.cumsum(np.concatenate(counts))))
+    return Adjacency(indptr, np.concatenate(indices), np.concatenate(directions), movement_directions)
+
+
+def label_components(free: np.ndarray) -> np.ndarray:
+
+    # Hook-and-shortcut labelling straight from the grid: every tree is
+    # hooked onto the smallest root it touches across an 8-neighbour edge,
+    # then paths are compressed, until no edge joins two different roots.
+    # Each undirected edge is seen once, from one of four offsets, and only
+    # one offset's edges exist at a time.
+    rows, cols = free.shape
+    parent = np.arange(free.size, dtype=np.int32 if free.size < 2 ** 31 else np.int64)
+    grid_parent = parent.reshape(rows, cols)
+    edges = []
+    for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        source = (slice(0, rows - dx), slice(max(-dy, 0), cols - max(dy, 0)))
+        target = (slice(dx, rows), slice(max(dy, 0), cols - max(-dy, 0)))
+        edges.append((source, target, free[source] & free[target]))
+
+    while True:
+        joined = False
+        for source, target, both_free in edges:
+            source_roots, target_roots = grid_parent[source][both_free], grid_parent[target][both_free]
+            differ = source_roots != target_roots
+            if differ.any():
+                joined = True
+                source_roots, target_roots = source_roots[differ], target_roots[differ]
+                np.minimum.at(parent, source_roots, target_roots)
+                np.minimum.at(parent, target_roots, source_roots)
+        if not joined:
+            break
+        while True:
+            compressed = parent[parent]
+            if np.array_equal(compressed, parent):
+                break
+            parent[:] = compressed
+
+    return np.where(free, grid_parent, -1)
+
+
+def paint_rectangles(shape: tuple, x0: np.ndarray, x1: np.ndarray, y0: np.ndarray, y1: np.ndarray) -> np.ndarray:
+
+    # Rasterises (batch, n) half-open rectangles [x0, x1) x [y0, y1) with a
+    # 2D difference array: +1/-1 at the corners, then a cumulative sum
+    batch, rows, cols = shape
+    index = np.broadcast_to(np.arange(batch)[:, None], x0.shape)
+    difference = np.zeros((batch, rows + 1, cols + 1), dtype=np.int32)
+    np.add.at(difference, (index, x0, y0), 1)
+    np.add.at(difference, (index, x0, y1), -1)
+    np.add.at(difference, (index, x1, y0), -1)
+    np.add.at(difference, (index, x1, y1), 1)
+
+    coverage = difference.cumsum(axis=1).cumsum(axis=2)
+    return coverage[:, :rows, :cols] > 0
@@ -0,0 +1,99 @@
+from grid import Map, EIGHT_CONNECTED, EIGHT_CONNECTED_HOVER
+import fox_traversals
+from search_result import SearchResult, timed
+import numpy as np
+
+
+@timed
+def hover(start_point: tuple, trajectory: tuple, occupancy_map: Map,
+          on_expand=None, on_push=None) -> SearchResult:
+
+    # With a "stay in place" action the set of cells reachable by t only
+    # grows, so the target can be caught at t as soon as the obstacle-aware
+    # distance to target(t) is at most t. The ego walks there and waits.
+    if not occupancy_map.interception_possible(start_point, trajectory):
+        return SearchResult()
+    # Time-varying blockages break the single distance transform, so those
+    # maps take the space-time search with the same stencil instead
+    if occupancy_map.overrides:
+        return fox_traversals.bfs(start_point, trajectory, occupancy_map, EIGHT_CONNECTED_HOVER,
+                                  on_expand, on_push)
+
+    points = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+    rows, cols = occupancy_map.grid.shape
+    result = SearchResult()
+    distances = distance_field(
+        start_point, occupancy_map, result, on_expand, on_push)
+
+    inside = (0 <= points[:, 0]) & (points[:, 0] < rows) & \
+        (0 <= points[:, 1]) & (points[:, 1] < cols)
+    xs, ys = np.where(inside, points[:, 0], 0), np.where(inside, points[:, 1], 0)
+    target_distances = distances[xs, ys]
+    # Past the start the ego can only wait on free cells
+    waitable = occupancy_map.grid[xs, ys] == 0
+    waitable[0] = True
+    caught = inside & waitable & (0 <= target_distances) & \
+        (target_distances <= np.arange(len(points)))
+
+    if not caught.any():
+        return result
+
+    time_step = int(np.argmax(caught))
+    path = descend(points[time_step], distances)
+    result.path = path + [path[-1]] * (time_step - len(path) + 1)
+    result.interception_time = time_step
+    return result
+
+
+def distance_field(start_point: tuple, occupancy_map: Map, result: SearchResult = None,
+                   on_expand=None, on_push=None) -> np.ndarray:
+
+    # Number of moves from the start to every cell through free space, -1
+    # where unreachable. Level-synchronous BFS over the cached neighbour table;
+    # counters go to result and callbacks receive (level, frontier cells).
+    if result is None:
+        result = SearchResult()
+    adjacency = occupancy_map.get_adjacency(EIGHT_CONNECTED)
+    distances = np.full(occupancy_map.grid.size, -1, dtype=np.int64)
+    frontier = np.array([start_point[0] * occupancy_map.grid.shape[1] + start_point[1]])
+    distances[frontier] = 0
+    level = 0
+    result.pushes = result.visited = result.max_open = 1
+
+    while frontier.size:
+        if on_expand is not None:
+            on_expand(level, frontier)
+        result.expanded += frontier.size
+        level += 1
+        firsts = adjacency.indptr[frontier]
+        counts = adjacency.indptr[frontier + 1] - firsts
+        edges = np.arange(counts.sum()) + np.repeat(firsts - (np.cumsum(counts) - counts), counts)
+        neighbours = adjacency.indices[edges]
+        frontier = np.unique(neighbours[distances[neighbours] < 0])
+        distances[frontier] = level
+        result.duplicates += len(neighbours) - frontier.size
+        result.pushes += frontier.size
+        result.visited += frontier.size
+        result.max_open = max(result.max_open, frontier.size)
+        if on_push is not None and frontier.size:
+            on_push(level, frontier)
+
+    return distances.reshape(occupancy_map.grid.shape)
+
+
+def descend(goal: np.ndarray, distances: np.ndarray) -> list:
+
+    # Walk the distance field downhill from the goal back to the start
+    rows, cols = distances.shape
+    x, y = int(goal[0]), int(goal[1])
+    path = [[x, y]]
+
+    while distances[x, y] > 0:
+        for dx, dy in EIGHT_CONNECTED:
+            px, py = x - int(dx), y - int(dy)
+            if 0 <= px < rows and 0 <= py < cols and distances[px, py] == distances[x, y] - 1:
+                x, y = px, py
+                break
+        path.append([x, y])
+
+    return path[::-1]
@@ -0,0 +1,55 @@
+from grid import Map, EIGHT_CONNECTED
+import numpy as np
+
+
+UNREACHABLE = -1
+
+
+def interception_field(trajectory: tuple, occupancy_map: Map) -> np.ndarray:
+
+    # Earliest interception time for an ego launched from every cell at t = 0,
+    # UNREACHABLE where the target cannot be caught. Sweeping backwards,
+    # field holds for each cell the earliest catch time from being there at t:
+    # t itself on the target cell, otherwise the best neighbour free at t + 1.
+    targets = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+    rows, cols = occupancy_map.grid.shape
+    free = occupancy_map.grid == 0
+    horizon = occupancy_map.overrides.horizon
+    never = np.iinfo(np.int32).max
+    field = np.full((rows, cols), never, dtype=np.int32)
+
+    for t in range(len(targets) - 1, -1, -1):
+        if t < len(targets) - 1:
+            field = neighbour_minimum(
+                np.where(occupancy_map.free_at(t + 1) if t + 1 < horizon else free, field, never))
+        x, y = targets[t]
+        if 0 <= x < rows and 0 <= y < cols:
+            field[x, y] = t
+
+    field[field == never] = UNREACHABLE
+    return field
+
+
+def query_interception_time(field: np.ndarray, start_points: np.ndarray):
+
+    # A single (x, y) start gives an int or None, an (N, 2) array of starts
+    # gives an array of times with UNREACHABLE entries
+    start_points = np.asarray(start_points, dtype=np.int64)
+    times = field[start_points[..., 0], start_points[..., 1]]
+    if start_points.ndim == 1:
+        return None if times == UNREACHABLE else int(times)
+    return times
+
+
+def neighbour_minimum(values: np.ndarray, movement_directions: np.ndarray = EIGHT_CONNECTED) -> np.ndarray:
+
+    # Minimum over the cells one move away, the min-plus analogue of bitset.dilate
+    rows, cols = values.shape
+    lowest = np.full_like(values, np.iinfo(values.dtype).max)
+
+    for dx, dy in movement_directions:
+        np.minimum(lowest[max(-dx, 0):rows - max(dx, 0), max(-dy, 0):cols - max(dy, 0)],
+                   values[max(dx, 0):rows + min(dx, 0), max(dy, 0):cols + min(dy, 0)],
+                   out=lowest[max(-dx, 0):rows - max(dx, 0), max(-dy, 0):cols - max(dy, 0)])
+
+    return lowest
@@ -1,41 +1,169 @@
 import argparse
+import json
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from grid import Map
 from fox_traversals import *
+from wavefront import wavefront
+from hover import hover
+from cpp_bfs import cpp_bfs
+from profiling import profile_solve
+from result_cache import ResultCache
 import random
-import matplotlib.pyplot as plt
+import numpy as np
 
 
-def main(args):
-    for i in range(args.num_iterations):
-        dummy_map = Map(width=args.map_width,
-                        height=args.map_height, resolution=args.map_resolution)
-        circle = args.circle
+ALGORITHMS = {'dijkstra': dijkstra, 'astar': astar,
+              'bfs': bfs, 'wavefront': wavefront, 'hover': hover, 'cpp_bfs': cpp_bfs}
 
-        if not circle:
-            dummy_map.add_n_obstacles(args.num_obstacles)
-            trajectory = dummy_map.get_wall_trajectory()
-            start = (int(random.random() * dummy_map.width / dummy_map.resolution),
-                     int(random.random() * dummy_map.height / dummy_map.resolution))
-        else:
-            start = (int(random.random() * dummy_map.width / dummy_map.resolution),
-                     int(random.random() * dummy_map.height / dummy_map.resolution))
-            center = (random.random() * dummy_map.width,
-                      random.random() * dummy_map.height)
-            trajectory = dummy_map.get_circular_trajectory(center)
-
-        tuple_of_trajs = tuple(tuple(sublist) for sublist in trajectory)
-
-        if args.algorithm == 'dijkstra':
-            path = dijkstra(start, tuple_of_trajs, dummy_map)
-        elif args.algorithm == 'bfs':
-            path = bfs(start, tuple_of_trajs, dummy_map)
+
+def generate_scenario(args, rng: np.random.Generator = None):
+
+    # Obstacles come from rng when one is given, else from the global random module
+    dummy_map = Map(width=args.map_width,
+                    height=args.map_height, resolution=args.map_resolution)
+    circle = args.circle
+
+    if not circle:
+        if rng is not None:
+            dummy_map.add_random_obstacles(args.num_obstacles, rng)
         else:
-            print("Select 'dijkstra' and 'bfs'.")
-            return
-        plt.show()
+            dummy_map.add_n_obstacles(args.num_obstacles)
+        trajectory = dummy_map.get_wall_trajectory()
+        start = (int(random.random() * dummy_map.width / dummy_map.resolution),
+                 int(random.random() * dummy_map.height / dummy_map.resolution))
+    else:
+        start = (int(random.random() * dummy_map.width / dummy_map.resolution),
+                 int(random.random() * dummy_map.height / dummy_map.resolution))
+        center = (random.random() * dummy_map.width,
+                  random.random() * dummy_map.height)
+        trajectory = dummy_map.get_circular_trajectory(center)
+
+    tuple_of_trajs = tuple(tuple(sublist) for sublist in trajectory)
+    return dummy_map, start, tuple_of_trajs
+
+
+def scenario_seeds(master_seed, n: int) -> list:
+
+    # Scenario i gets the same seed for a given master seed, whichever
+    # worker runs it and in whatever order
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(master_seed).spawn(n)]
+
+
+# One result cache per process, opened on first use
+_result_cache = None
+
+
+def get_solver(args):
+
+    global _result_cache
+    solver = ALGORITHMS[args.algorithm]
+    if not (args.cache or args.cache_db):
+        return solver
+    if _result_cache is None:
+        _result_cache = ResultCache(args.cache_mb << 20, args.cache_db)
+    return _result_cache.memoize(solver, args.algorithm)
+
+
+def solve_scenario(args, index: int, seed):
+
+    rng = None
+    if seed is not None:
+        random.seed(seed)
+        rng = np.random.default_rng(seed)
+    generation_start = time.perf_counter()
+    dummy_map, start, tuple_of_trajs = generate_scenario(args, rng)
+    generation_time = time.perf_counter() - generation_start
+
+    # Profiles are keyed by algorithm and map parameters
+    label = (f"{args.algorithm}_{'circle' if args.circle else 'wall'}_{args.map_width}x{args.map_height}"
+             f"_r{args.map_resolution}_o{args.num_obstacles}_{index}")
+    profiler = profile_solve(args.profile, label) if args.profile else nullcontext()
+
+    with profiler as profile:
+        solve_start = time.perf_counter()
+        search = get_solver(args)(start, tuple_of_trajs, dummy_map)
+        solve_time = time.perf_counter() - solve_start
+
+    result = {'scenario': index, 'seed': seed, 'start': list(start),
+              'interception_time': search.interception_time,
+              'generation_time': generation_time, 'solve_time': solve_time,
+              'expanded': search.expanded, 'pushes': search.pushes,
+              'duplicates': search.duplicates, 'max_open': search.max_open,
+              'visited': search.visited}
+    if profile is not None:
+        result['profile'] = profile
+    return dummy_map, search.path, result
+
+
+def run_scenario(args, index: int, seed: int) -> dict:
+
+    return solve_scenario(args, index, seed)[2]
+
+
+def run_parallel(args) -> list:
+
+    seeds = scenario_seeds(args.seed, args.num_iterations)
+    results = []
+    intercepted, solve_time = 0, 0.0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_scenario, args, i, seed)
+                   for i, seed in enumerate(seeds)]
+
+        for completed, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            intercepted += result['interception_time'] is not None
+            solve_time += result['solve_time']
+            print(json.dumps(dict(result, completed=completed, intercepted=intercepted,
+                                  mean_solve_time=solve_time / completed)), flush=True)
+
+    return sorted(results, key=lambda result: result['scenario'])
+
+
+def run_serial(args) -> list:
+
+    seeds = scenario_seeds(args.seed, args.num_iterations) if args.seed is not None else None
+    results = []
+
+    for i in range(args.num_iterations):
+        dummy_map, path, result = solve_scenario(
+            args, i, seeds[i] if seeds else None)
+        results.append(result)
+
+        if args.no_render:
+            print(json.dumps(result), flush=True)
+            continue
+
+        if args.export:
+            os.makedirs(args.export, exist_ok=True)
+            dummy_map.export(path, os.path.join(
+                args.export, f"scenario_{i}.{args.export_format}"))
+            continue
+
         dummy_map.simulate(path)
-        plt.clf()
-        plt.close()
+
+    return results
+
+
+def main(args):
+    results = run_parallel(args) if args.workers else run_serial(args)
+
+    if args.profile:
+        with open(os.path.join(args.profile, 'allocations.json'), 'w') as allocations_file:
+            json.dump({result['profile']['label']: dict(result['profile'], algorithm=args.algorithm,
+                                                        map_width=args.map_width, map_height=args.map_height,
+                                                        map_resolution=args.map_resolution,
+                                                        num_obstacles=args.num_obstacles, circle=args.circle)
+                       for result in results}, allocations_file, indent=2)
+
+    if args.stats_json:
+        with open(args.stats_json, 'w') as stats_file:
+            json.dump({'args': vars(args), 'scenarios': results},
+                      stats_file, indent=2)
 
 
 if __name__ == '__main__':
@@ -53,8 +181,28 @@ if __name__ == '__main__':
                         default=5, help="Height of the map.")
     parser.add_argument('--map_resolution', type=int,
                         default=0.1, help="Resolution of the map.")
-    parser.add_argument('--algorithm', type=str, default='dijkstra', choices=[
-                        'dijkstra', 'bfs'], help="Path planning algorithm to use ('dijkstra' or 'bfs').")
+    parser.add_argument('--algorithm', type=str, default='dijkstra', choices=list(ALGORITHMS),
+                        help="Path planning algorithm to use ('dijkstra', 'astar', 'bfs', 'wavefront', 'hover' or 'cpp_bfs').")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Run headless on a pool of this many processes, streaming one JSON line per scenario.")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Master seed from which every scenario's seed is derived.")
+    parser.add_argument('--no-render', action='store_true',
+                        help="Skip plotting and print one JSON line per scenario instead.")
+    parser.add_argument('--export', type=str, default=None,
+                        help="Write each simulation to this directory as a video instead of showing it.")
+    parser.add_argument('--export-format', type=str, default='gif', choices=['gif', 'mp4'],
+                        help="Video format for --export; mp4 needs ffmpeg.")
+    parser.add_argument('--cache', action='store_true',
+                        help="Memoize solver results in memory, keyed by map, start and trajectory.")
+    parser.add_argument('--cache-mb', type=int, default=64,
+                        help="Size of the in-memory result cache in MiB.")
+    parser.add_argument('--cache-db', type=str, default=None,
+                        help="sqlite file backing the result cache across runs; implies --cache.")
+    parser.add_argument('--stats-json', type=str, default=None,
+                        help="Write per-scenario generation and solve timings to this JSON file.")
+    parser.add_argument('--profile', type=str, default=None,
+                        help="Profile every solve with cProfile and tracemalloc, writing reports to this directory.")
 
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,92 @@
+import hashlib
+import numpy as np
+
+
+class Overrides:
+
+    # Sparse time-indexed blockages on top of a static grid. Each window
+    # blocks a set of flat cell indices (x * cols + y) for the time steps
+    # [start, stop), so a hazard costs memory per cell it touches rather than
+    # per time step of the horizon. Two views are built lazily from the
+    # windows: per-cell interval lists for single-state queries and start/stop
+    # arrays for pulling out every cell blocked at one time step.
+
+    def __init__(self, shape: tuple) -> None:
+
+        self.shape = shape
+        self.windows = []
+        # Bumped on every change so that consumers holding derived state
+        # (e.g. replanning.Replanner) know to rebuild it
+        self.version = 0
+        self._intervals = None
+        self._bounds = None
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    @property
+    def horizon(self) -> int:
+
+        # First time step from which the static grid alone applies
+        return max((stop for _, stop, _ in self.windows), default=0)
+
+    def content_hash(self) -> str:
+
+        # Identifies the windows in the order they were added
+        digest = hashlib.sha256()
+        for start, stop, flat in self.windows:
+            digest.update(np.array([start, stop, flat.size], dtype=np.int64).tobytes())
+            digest.update(flat.astype(np.int64).tobytes())
+        return digest.hexdigest()
+
+    def block(self, cells, start: int, stop: int) -> None:
+
+        # cells is a boolean (rows, cols) mask or a sequence of (x, y) points;
+        # points outside the grid are ignored
+        if start >= stop:
+            return
+        cells = np.asarray(cells)
+        if cells.dtype == bool:
+            flat = np.flatnonzero(cells)
+        else:
+            points = cells.astype(np.int64).reshape(-1, 2)
+            inside = (0 <= points[:, 0]) & (points[:, 0] < self.shape[0]) & \
+                (0 <= points[:, 1]) & (points[:, 1] < self.shape[1])
+            flat = np.unique(points[inside, 0] * self.shape[1] + points[inside, 1])
+        if flat.size:
+            self.windows.append((int(start), int(stop), flat))
+            self.version += 1
+            self._intervals = self._bounds = None
+
+    def block_moving(self, positions: list, start: int = 0, radius: int = 0) -> None:
+
+        # A hazard at positions[i] during time step start + i, blocking every
+        # cell within Chebyshev distance radius of it
+        offsets = np.indices((2 * radius + 1, 2 * radius + 1)).reshape(2, -1).T - radius
+        for i, position in enumerate(np.asarray(positions, dtype=np.int64).reshape(-1, 2)):
+            self.block(position + offsets, start + i, start + i + 1)
+
+    def is_blocked(self, time_step: int, cell: int) -> bool:
+
+        if not self.windows:
+            return False
+        if self._intervals is None:
+            self._intervals = {}
+            for start, stop, flat in self.windows:
+                for blocked_cell in flat.tolist():
+                    self._intervals.setdefault(blocked_cell, []).append((start, stop))
+        return any(start <= time_step < stop for start, stop in self._intervals.get(cell, ()))
+
+    def blocked_at(self, time_step: int) -> np.ndarray:
+
+        # Flat indices of the cells blocked at time_step, possibly repeated
+        if not self.windows:
+            return np.zeros(0, dtype=np.int64)
+        if self._bounds is None:
+            self._bounds = (np.array([start for start, _, _ in self.windows]),
+                            np.array([stop for _, stop, _ in self.windows]))
+        starts, stops = self._bounds
+        active = np.flatnonzero((starts <= time_step) & (time_step < stops))
+        if not active.size:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.windows[i][2] for i in active])
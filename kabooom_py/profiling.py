@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+import cProfile
+import os
+import threading
+import tracemalloc
+
+
+@contextmanager
+def profile_solve(output_dir: str, label: str, top: int = 20, interval: float = 0.001, growth: float = 1.1):
+
+    # Profiles the enclosed block with cProfile and tracemalloc, writing
+    # <label>.pstats and <label>.allocations.txt to output_dir. The yielded
+    # dict is filled with the peak traced memory and the top allocation sites
+    # once the block exits.
+    os.makedirs(output_dir, exist_ok=True)
+    report = {'label': label,
+              'pstats': os.path.join(output_dir, f"{label}.pstats")}
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    # Search state is garbage by the time the block exits, so a sampler
+    # thread snapshots the heap while it is alive, each time it has grown by
+    # the growth factor. The largest snapshot is the one reported.
+    peak = {'size': 0, 'snapshot': None}
+    stop = threading.Event()
+    sampler = threading.Thread(target=_sample_peak, args=(peak, stop, interval, growth), daemon=True)
+    sampler.start()
+    profiler.enable()
+
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        stop.set()
+        sampler.join()
+        current, report['peak_bytes'] = tracemalloc.get_traced_memory()
+        if peak['snapshot'] is None or current > peak['size']:
+            peak.update(size=current, snapshot=tracemalloc.take_snapshot())
+        tracemalloc.stop()
+        report['snapshot_bytes'] = peak['size']
+
+        profiler.dump_stats(report['pstats'])
+        statistics = peak['snapshot'].filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__),
+             tracemalloc.Filter(False, threading.__file__),
+             tracemalloc.Filter(False, __file__)]).statistics('lineno')[:top]
+        report['top_allocations'] = [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                                      'size_bytes': stat.size, 'count': stat.count}
+                                     for stat in statistics]
+
+        with open(os.path.join(output_dir, f"{label}.allocations.txt"), 'w') as allocations_file:
+            allocations_file.write(
+                f"{label}: peak traced memory {report['peak_bytes'] / 1024:.1f} KiB, "
+                f"allocations below taken at {report['snapshot_bytes'] / 1024:.1f} KiB\n")
+            for allocation in report['top_allocations']:
+                allocations_file.write(
+                    f"{allocation['size_bytes'] / 1024:10.1f} KiB {allocation['count']:8d} blocks  {allocation['location']}\n")
+
+
+def _sample_peak(peak: dict, stop: threading.Event, interval: float, growth: float) -> None:
+
+    while not stop.wait(interval):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > peak['size'] * growth:
+            peak.update(size=current, snapshot=tracemalloc.take_snapshot())
@@ -0,0 +1,108 @@
+import os
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation, PillowWriter, FFMpegWriter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from grid import Map, MapState
+
+
+# Export writers by file extension; GIFs only need Pillow, MP4 needs ffmpeg
+WRITERS = {'.gif': PillowWriter, '.mp4': FFMpegWriter}
+
+
+def simulate(occupancy_map: Map, path: list, interval: int = 100) -> None:
+    if not path:
+        print(f"No interception possible!")
+        return
+
+    figure = plt.figure()
+    # Keep a reference so the animation is not garbage collected while shown
+    figure.animation = animate(figure, occupancy_map, path, interval, blit=True)
+    # Plays through once and closes, like the original frame loop, so
+    # callers running several simulations are not held up by the window
+    steps = min(len(path), len(occupancy_map.trajectory))
+    plt.show(block=False)
+    plt.pause(steps * interval / 1000)
+    plt.close(figure)
+
+
+def export(occupancy_map: Map, path: list, filename: str, fps: int = 10, dpi: int = 100) -> None:
+
+    # Renders offscreen on an Agg canvas, so no display is needed
+    if not path:
+        print(f"No interception possible!")
+        return
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported export format '{extension}', use one of {list(WRITERS)}.")
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    update, steps = scene(figure, occupancy_map, path, animated=False)
+    # Driving the writer directly draws each frame once, where
+    # FuncAnimation.save would draw it again before grabbing it
+    writer = WRITERS[extension](fps=fps)
+    with writer.saving(figure, filename, dpi):
+        for idx in range(steps):
+            update(idx)
+            writer.grab_frame()
+
+
+def animate(figure, occupancy_map: Map, path: list, interval: float, blit: bool) -> FuncAnimation:
+
+    update, steps = scene(figure, occupancy_map, path, animated=blit)
+    return FuncAnimation(figure, update, frames=steps, interval=interval, blit=blit, repeat=False)
+
+
+def scene(figure, occupancy_map: Map, path: list, animated: bool) -> tuple:
+
+    # Sets up one AxesImage whose data is repainted in place and returns
+    # (update, steps). Only the cells drawn on the previous step are restored
+    # from the map, which is never mutated.
+    rows, cols = occupancy_map.grid.shape
+    steps = min(len(path), len(occupancy_map.trajectory))
+    egos = _clip(path[:steps], rows, cols)
+    targets = _clip(occupancy_map.trajectory[:steps], rows, cols)
+    frame = occupancy_map.grid.copy()
+    painted = []
+
+    cmap = occupancy_map.cmap
+    axes = figure.add_subplot()
+    image = axes.imshow(frame, cmap=cmap, vmin=0, vmax=len(MapState) - 1,
+                        interpolation='nearest', animated=animated)
+    label = axes.text(0.02, 0.98, '', transform=axes.transAxes, va='top',
+                      color=cmap(MapState.TARGET_STATE.value), animated=animated)
+    axes.legend(handles=[Patch(color=cmap(state.value), label=name) for state, name in
+                         ((MapState.EGO_STATE, 'Ego'), (MapState.TARGET_STATE, 'Target'),
+                          (MapState.FREE, 'Free'), (MapState.OCCUPIED, 'Occupied'))],
+                loc='upper left', bbox_to_anchor=(1.05, 1))
+    axes.set_title('Simulation')
+    axes.set_xlabel('X Coordinate')
+    axes.set_ylabel('Y Coordinate')
+    figure.tight_layout()
+
+    def update(idx):
+        for x, y in painted:
+            frame[x, y] = occupancy_map.grid[x, y]
+        painted.clear()
+        for cell, state in ((egos[idx], MapState.EGO_STATE), (targets[idx], MapState.TARGET_STATE)):
+            if cell is not None:
+                frame[cell] = state.value
+                painted.append(cell)
+        image.set_data(frame)
+        label.set_text('Simulation Time Step: {}'.format(idx))
+        return image, label
+
+    return update, steps
+
+
+def _clip(points: list, rows: int, cols: int) -> list:
+
+    return [(int(x), int(y)) if 0 <= x < rows and 0 <= y < cols else None for x, y in points]
+
+
+def visualize(occupancy_map: Map) -> None:
+    plt.imshow(occupancy_map.grid)
+    plt.show()
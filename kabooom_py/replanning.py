@@ -0,0 +1,68 @@
+from grid import Map
+from search_result import SearchResult, timed
+from wavefront import ReachableLayers, backtrack
+import bitset
+import numpy as np
+
+
+class Replanner:
+
+    # Keeps the space-time search state of one ego across track revisions.
+    # Where the ego can be at time t does not depend on the target, so the
+    # bit-packed reachable layers are grown once and shared by every plan;
+    # only the interception test reads the trajectory. A revision after t0
+    # therefore keeps every layer and every test before t0, and resumes the
+    # scan at t0 on the layers already built.
+
+    def __init__(self, start_point: tuple, occupancy_map: Map) -> None:
+
+        self.start_point = tuple(start_point)
+        self.occupancy_map = occupancy_map
+        self.trajectory = np.zeros((0, 2), dtype=np.int64)
+        self._reset()
+
+    def _reset(self) -> None:
+
+        self.reachable = ReachableLayers(self.start_point, self.occupancy_map)
+        self.result = SearchResult()
+        self.checked = 0
+
+    @timed
+    def plan(self, trajectory: tuple, t0: int = None, on_expand=None, on_push=None) -> SearchResult:
+
+        # Earliest interception of the revised trajectory. t0 is the first time
+        # step that may differ from the previous revision; it is found by
+        # comparison when not given. Counters only cover the work this call did.
+        targets = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+        if self.reachable.stale():
+            self._reset()
+
+        common = min(len(targets), len(self.trajectory))
+        if t0 is None:
+            differs = np.flatnonzero((targets[:common] != self.trajectory[:common]).any(axis=1))
+            t0 = int(differs[0]) if differs.size else common
+        t0 = min(t0, common)
+        self.trajectory = targets
+
+        # A catch before t0 is still the earliest one
+        if self.result and self.result.interception_time < t0:
+            return SearchResult(path=self.result.path)
+
+        self.checked = min(self.checked, t0)
+        rows, cols = self.occupancy_map.grid.shape
+        result = SearchResult()
+
+        for t in range(self.checked, len(targets)):
+            layer = self.reachable.get(t, result, on_expand, on_push)
+            if layer is None:
+                break
+            x, y = targets[t]
+            if 0 <= x < rows and 0 <= y < cols and bitset.is_set(layer, x, y):
+                result.path = backtrack((x, y), t, lambda s, px, py: bitset.is_set(
+                    self.reachable.get(s), px, py), (rows, cols))
+                result.interception_time = t
+                break
+            self.checked = t + 1
+
+        self.result = SearchResult(path=result.path, interception_time=result.interception_time)
+        return result
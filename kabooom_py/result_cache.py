@@ -0,0 +1,108 @@
+from collections import OrderedDict
+import dataclasses
+import functools
+import hashlib
+import json
+import sqlite3
+from grid import Map
+from search_result import SearchResult, timed
+import numpy as np
+
+
+class ResultCache:
+
+    # Memoizes solver results under a hash of the algorithm, the map content
+    # (grid and overrides), the start and the trajectory. Entries live as
+    # JSON in an in-memory LRU bounded by max_bytes and, when a path is
+    # given, in an sqlite file that outlives the process; disk hits are
+    # promoted back into memory.
+
+    def __init__(self, max_bytes: int = 64 << 20, path: str = None) -> None:
+
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.disk_hits = self.misses = 0
+        self.database = None
+        if path is not None:
+            self.database = sqlite3.connect(path, timeout=30)
+            self.database.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            self.database.commit()
+
+    @staticmethod
+    def key(algorithm: str, occupancy_map: Map, start_point: tuple, trajectory: tuple, *args, **kwargs) -> str:
+
+        digest = hashlib.sha256(algorithm.encode())
+        digest.update(occupancy_map.content_hash().encode())
+        digest.update(occupancy_map.overrides.content_hash().encode())
+        digest.update(np.array(start_point[:2], dtype=np.int64).tobytes())
+        digest.update(np.asarray(trajectory, dtype=np.int64).reshape(-1, 2).tobytes())
+        # Extra solver arguments such as movement_directions
+        for argument in args + tuple(value for _, value in sorted(kwargs.items())):
+            digest.update(np.asarray(argument).tobytes() if isinstance(argument, np.ndarray)
+                          else repr(argument).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> SearchResult:
+
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        elif self.database is not None:
+            row = self.database.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value = row[0]
+                self._remember(key, value)
+                self.disk_hits += 1
+        if value is None:
+            self.misses += 1
+            return None
+        return SearchResult(**json.loads(value))
+
+    def put(self, key: str, result: SearchResult) -> None:
+
+        value = json.dumps(dataclasses.asdict(result)).encode()
+        self._remember(key, value)
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (key, value))
+            self.database.commit()
+
+    def _remember(self, key: str, value: bytes) -> None:
+
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        if len(value) > self.max_bytes:
+            return
+        self.entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            self.size -= len(self.entries.popitem(last=False)[1])
+
+    def memoize(self, solver, algorithm: str = None):
+
+        # Same signature as the solver. Calls with search callbacks bypass the
+        # cache, since they expect to observe the search itself. A hit keeps
+        # the counters of the original solve; elapsed covers the lookup.
+        algorithm = algorithm or solver.__name__
+
+        @timed
+        @functools.wraps(solver)
+        def cached(start_point, trajectory, occupancy_map, *args, on_expand=None, on_push=None, **kwargs):
+            if on_expand is not None or on_push is not None:
+                return solver(start_point, trajectory, occupancy_map, *args,
+                              on_expand=on_expand, on_push=on_push, **kwargs)
+            key = self.key(algorithm, occupancy_map, start_point, trajectory, *args, **kwargs)
+            result = self.get(key)
+            if result is None:
+                result = solver(start_point, trajectory, occupancy_map, *args, **kwargs)
+                self.put(key, result)
+            return result
+
+        return cached
+
+    def close(self) -> None:
+        if self.database is not None:
+            self.database.close()
+            self.database = None
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+import functools
+import time
+
+
+@dataclass
+class SearchResult:
+    # path is None when no interception is possible. The counters are
+    # whatever the engine can measure cheaply; layered engines count cells
+    # in the reachable sets they swept as expanded/visited states.
+    path: list = None
+    interception_time: int = None
+    expanded: int = 0
+    pushes: int = 0
+    duplicates: int = 0
+    max_open: int = 0
+    visited: int = 0
+    elapsed: float = 0.0
+
+    def __post_init__(self):
+        if self.path is not None and self.interception_time is None:
+            self.interception_time = len(self.path) - 1
+
+    def __bool__(self) -> bool:
+        return self.path is not None
+
+
+def timed(solver):
+
+    # Fills in SearchResult.elapsed around a solver call
+    @functools.wraps(solver)
+    def wrapper(*args, **kwargs):
+        solve_start = time.perf_counter()
+        result = solver(*args, **kwargs)
+        result.elapsed = time.perf_counter() - solve_start
+        return result
+
+    return wrapper
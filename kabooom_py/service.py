@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import dataclasses
+import json
+from concurrent.futures import ProcessPoolExecutor
+from grid import Map
+from main import ALGORITHMS
+from wavefront import BATCH_SIZE, wavefront_batch
+from interception_field import UNREACHABLE
+import numpy as np
+
+
+# Newline-delimited JSON over a UNIX socket or localhost TCP. Every request is
+# one object with an "op" and gets one object back, in order:
+#   {"op": "upload", "grid": [[...]], "resolution": 0.1} -> {"map": <hash>}
+#   {"op": "solve", "map": <hash>, "start": [x, y], "trajectory": [[x, y], ...],
+#    "algorithm": "wavefront"} -> {"interception_time": t, "path": [...], ...}
+# Failures are reported as {"error": <message>}.
+
+# Maps kept per worker process, so that repeated queries reuse the cached
+# neighbour tables instead of rebuilding them. Tasks name the map by its hash
+# only; the grid is shipped in a retry when the worker reports a miss.
+WORKER_MAPS = 32
+_worker_maps = {}
+
+
+class MapNotCached(LookupError):
+    pass
+
+
+def _worker_map(key: str, upload: tuple) -> Map:
+
+    # upload is None or the (grid, resolution) to build the map from
+    occupancy_map = _worker_maps.pop(key, None)
+    if occupancy_map is None:
+        if upload is None:
+            raise MapNotCached(key)
+        occupancy_map = Map.from_grid(*upload)
+        if len(_worker_maps) >= WORKER_MAPS:
+            del _worker_maps[next(iter(_worker_maps))]
+    _worker_maps[key] = occupancy_map
+    return occupancy_map
+
+
+def _sweep(key: str, upload: tuple, starts: np.ndarray, trajectory: np.ndarray) -> tuple:
+
+    times, paths = wavefront_batch(starts, trajectory, _worker_map(key, upload))
+    return times.tolist(), paths
+
+
+def _solve(key: str, upload: tuple, algorithm: str, start: tuple, trajectory: np.ndarray) -> dict:
+
+    search = ALGORITHMS[algorithm](start, trajectory, _worker_map(key, upload))
+    return dataclasses.asdict(search)
+
+
+class PlanningService:
+
+    # Solves run on a process pool so the event loop only parses requests.
+    # Wavefront queries that share a map and a trajectory are held for up to
+    # batch_delay seconds and answered by one multi-start sweep.
+
+    def __init__(self, workers: int = None, batch_delay: float = 0.002) -> None:
+
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.batch_delay = batch_delay
+        self.maps = {}
+        self.pending = {}
+        # The event loop only keeps weak references to running tasks
+        self.sweeps = set()
+
+    def upload(self, grid: list, resolution: float = 0.1) -> str:
+
+        occupancy_map = Map.from_grid(np.asarray(grid, dtype=np.uint8), resolution)
+        key = occupancy_map.content_hash()
+        self.maps.setdefault(key, occupancy_map)
+        return key
+
+    async def solve(self, key: str, start: tuple, trajectory: list, algorithm: str = 'wavefront') -> dict:
+
+        if key not in self.maps:
+            raise ValueError(f"Unknown map {key}, upload it first.")
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}', use one of {list(ALGORITHMS)}.")
+        occupancy_map = self.maps[key]
+        start = (int(start[0]), int(start[1]))
+        rows, cols = occupancy_map.grid.shape
+        if not (0 <= start[0] < rows and 0 <= start[1] < cols):
+            raise ValueError(f"Start {list(start)} is outside the {rows}x{cols} map.")
+        trajectory = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+
+        if algorithm != 'wavefront':
+            result = await self._submit(_solve, key, algorithm, start, trajectory)
+            return {'interception_time': result['interception_time'], 'path': result['path'],
+                    'expanded': result['expanded'], 'elapsed': result['elapsed']}
+
+        batch_key = (key, trajectory.tobytes())
+        batch = self.pending.get(batch_key)
+        if batch is None:
+            batch = self.pending[batch_key] = []
+            asyncio.get_running_loop().call_later(self.batch_delay, self._flush, batch_key, batch)
+        future = asyncio.get_running_loop().create_future()
+        batch.append((start, future))
+        if len(batch) >= BATCH_SIZE:
+            self._flush(batch_key, batch)
+        return await future
+
+    def _flush(self, batch_key: tuple, batch: list) -> None:
+
+        # The timer of a batch that already filled up finds it gone
+        if self.pending.get(batch_key) is batch:
+            del self.pending[batch_key]
+            sweep = asyncio.ensure_future(self._run_batch(batch_key[0], batch_key[1], batch))
+            self.sweeps.add(sweep)
+            sweep.add_done_callback(self.sweeps.discard)
+
+    async def _run_batch(self, key: str, trajectory: bytes, batch: list) -> None:
+
+        starts = np.array([start for start, _ in batch], dtype=np.int64)
+        try:
+            times, paths = await self._submit(
+                _sweep, key, starts, np.frombuffer(trajectory, dtype=np.int64).reshape(-1, 2))
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (_, future), time_step, path in zip(batch, times, paths):
+            if not future.done():
+                future.set_result({'interception_time': None if time_step == UNREACHABLE else time_step,
+                                   'path': path, 'batched': len(batch)})
+
+    async def _submit(self, task, key: str, *args):
+
+        # Tasks carry only the map hash. A worker without the map raises
+        # MapNotCached, and the task is resent with the grid, so a map is
+        # pickled at most once per worker (plus after eviction from
+        # WORKER_MAPS) rather than on every request.
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, task, key, None, *args)
+        except MapNotCached:
+            occupancy_map = self.maps[key]
+            return await loop.run_in_executor(
+                self.pool, task, key, (occupancy_map.grid, occupancy_map.resolution), *args)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+
+        # Requests on one connection are answered in order; concurrent
+        # clients are what fills the batches
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.dispatch(json.loads(line))
+                except Exception as error:
+                    response = {'error': f"{type(error).__name__}: {error}"}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def dispatch(self, request: dict) -> dict:
+
+        if request['op'] == 'upload':
+            return {'map': self.upload(request['grid'], request.get('resolution', 0.1))}
+        if request['op'] == 'solve':
+            return await self.solve(request['map'], request['start'], request['trajectory'],
+                                    request.get('algorithm', 'wavefront'))
+        if request['op'] == 'ping':
+            return {'maps': len(self.maps)}
+        raise ValueError(f"Unknown op '{request['op']}'.")
+
+    async def serve(self, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765) -> None:
+
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+
+class Client:
+
+    # Minimal client for the service protocol, one request in flight per
+    # connection; open several connections to have queries batched together
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def connect(cls, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765) -> 'Client':
+        if socket_path:
+            return cls(*await asyncio.open_unix_connection(socket_path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, **message) -> dict:
+        self.writer.write(json.dumps(message).encode() + b'\n')
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    async def upload(self, occupancy_map: Map) -> str:
+        response = await self.request(op='upload', grid=occupancy_map.grid.tolist(),
+                                      resolution=occupancy_map.resolution)
+        return response['map']
+
+    async def solve(self, key: str, start: tuple, trajectory: tuple, algorithm: str = 'wavefront') -> dict:
+        return await self.request(op='solve', map=key, start=[int(start[0]), int(start[1])],
+                                  trajectory=np.asarray(trajectory).tolist(), algorithm=algorithm)
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Serve interception queries over a UNIX socket or localhost TCP.")
+    parser.add_argument('--socket', type=str, default=None,
+                        help="UNIX socket path; localhost TCP is used when omitted.")
+    parser.add_argument('--port', type=int, default=8765,
+                        help="TCP port on 127.0.0.1.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Solver processes (default: one per CPU).")
+    parser.add_argument('--batch_delay', type=float, default=0.002,
+                        help="Seconds to hold wavefront queries so that concurrent ones share a sweep.")
+
+    args = parser.parse_args()
+    service = PlanningService(args.workers, args.batch_delay)
+    try:
+        asyncio.run(service.serve(args.socket, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
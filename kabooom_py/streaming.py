@@ -0,0 +1,77 @@
+import time
+from grid import Map
+from search_result import SearchResult, timed
+from wavefront import ReachableLayers, backtrack
+import bitset
+
+
+class StreamingPlanner:
+
+    # Follows a target whose positions arrive one time step at a time. Each
+    # observation advances the ego's reachable set by one layer and is tested
+    # against it, so a plan is available the moment a catch is feasible.
+    # Observations are not kept, and the layers stop growing once the
+    # reachable set becomes periodic (see wavefront.ReachableLayers).
+
+    def __init__(self, start_point: tuple, occupancy_map: Map, on_expand=None, on_push=None) -> None:
+
+        self.occupancy_map = occupancy_map
+        self.reachable = ReachableLayers(start_point, occupancy_map)
+        self.on_expand, self.on_push = on_expand, on_push
+        self.time_step = 0
+        self.result = SearchResult(pushes=1, visited=1, max_open=1)
+
+    @property
+    def exhausted(self) -> bool:
+
+        # No cell is reachable any more, so no later observation can be caught
+        return self.reachable.exhausted and self.time_step >= len(self.reachable.layers)
+
+    def observe(self, position: tuple) -> SearchResult:
+
+        # Target position at the next time step; returns the plan once the
+        # target is caught, None until then
+        if self.result:
+            return self.result
+        t = self.time_step
+        layer = self.reachable.get(t, self.result, self.on_expand, self.on_push)
+        self.time_step += 1
+        if layer is None:
+            return None
+
+        rows, cols = self.occupancy_map.grid.shape
+        x, y = int(position[0]), int(position[1])
+        if not (0 <= x < rows and 0 <= y < cols and bitset.is_set(layer, x, y)):
+            return None
+
+        self.result.path = backtrack((x, y), t, lambda s, px, py: bitset.is_set(
+            self.reachable.get(s), px, py), (rows, cols))
+        self.result.interception_time = t
+        return self.result
+
+
+@timed
+def plan_stream(start_point: tuple, positions, occupancy_map: Map,
+                on_expand=None, on_push=None) -> SearchResult:
+
+    # Consumes an iterable of target positions only as far as needed: it
+    # stops at the first interception or once nothing is reachable
+    planner = StreamingPlanner(start_point, occupancy_map, on_expand, on_push)
+    for position in positions:
+        if planner.observe(position) or planner.exhausted:
+            break
+    return planner.result
+
+
+async def plan_stream_async(start_point: tuple, positions, occupancy_map: Map,
+                            on_expand=None, on_push=None) -> SearchResult:
+
+    # plan_stream for an async iterable, e.g. a queue fed by a radar track;
+    # elapsed includes the time spent waiting for observations
+    solve_start = time.perf_counter()
+    planner = StreamingPlanner(start_point, occupancy_map, on_expand, on_push)
+    async for position in positions:
+        if planner.observe(position) or planner.exhausted:
+            break
+    planner.result.elapsed = time.perf_counter() - solve_start
+    return planner.result
@@ -0,0 +1,238 @@
+from grid import Map, EIGHT_CONNECTED
+from interception_field import UNREACHABLE
+from search_result import SearchResult, timed
+import bitset
+import numpy as np
+
+
+# Starts swept together as one stack of bit-packed layers
+BATCH_SIZE = 64
+
+
+@timed
+def wavefront(start_point: tuple, trajectory: tuple, occupancy_map: Map,
+              on_expand=None, on_push=None) -> SearchResult:
+
+    # Callbacks receive (t, layer) with the bit-packed reachable set: on_expand
+    # for the layer being dilated, on_push for the layer it produces
+    if not occupancy_map.interception_possible(start_point, trajectory):
+        return SearchResult()
+
+    targets = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+    rows, cols = occupancy_map.grid.shape
+    free_words = occupancy_map.get_packed_free()
+    horizon = occupancy_map.overrides.horizon
+
+    # Cells the ego can occupy at time t, one bit-packed layer per time step,
+    # advanced with word-level shifts and kept for path recovery
+    layer = np.zeros_like(free_words)
+    layer[start_point[0], start_point[1] >> 6] = np.uint64(1) << np.uint64(start_point[1] & 63)
+    layers = [layer]
+    stationary = False
+    layer_size = 1
+    result = SearchResult(pushes=1, visited=1, max_open=1)
+
+    for t, (x, y) in enumerate(targets):
+        if t > 0 and not stationary:
+            if on_expand is not None:
+                on_expand(t - 1, layer)
+            result.expanded += layer_size
+            next_layer = bitset.dilate(layer, occupancy_map.get_packed_free_at(t) if t < horizon else free_words)
+            layer_size = bitset.count(next_layer)
+            if not layer_size:
+                return result
+            if on_push is not None:
+                on_push(t, next_layer)
+            result.pushes += layer_size
+            result.visited += layer_size
+            result.max_open = max(result.max_open, layer_size)
+            # Once the reachable set stops changing it stays fixed, so the
+            # remaining time steps reduce to a membership test. Blockages
+            # still to come can shrink it again, so only past the horizon.
+            stationary = t >= horizon and np.array_equal(next_layer, layer)
+            layer = next_layer
+            if not stationary:
+                layers.append(layer)
+
+        if 0 <= x < rows and 0 <= y < cols and bitset.is_set(layer, x, y):
+            result.path = backtrack((x, y), t, lambda s, px, py: bitset.is_set(
+                layers[min(s, len(layers) - 1)], px, py), (rows, cols))
+            result.interception_time = t
+            return result
+
+    return result
+
+
+def wavefront_batch(start_points: np.ndarray, trajectory: tuple, occupancy_map: Map, return_paths: bool = True):
+
+    # Interception times (UNREACHABLE when none) and paths for an (N, 2) array
+    # of starts against one trajectory. Up to BATCH_SIZE starts are swept at
+    # once as a stack of bit-packed layers, dilated together. Each result
+    # matches what wavefront returns for that start alone.
+    starts = np.asarray(start_points, dtype=np.int64).reshape(-1, 2)
+    targets = np.asarray(trajectory, dtype=np.int64).reshape(-1, 2)
+    times = np.full(len(starts), UNREACHABLE, dtype=np.int64)
+    paths = [None] * len(starts)
+    # Starts that cannot intercept would otherwise be swept to the end
+    candidates = np.array([k for k, start in enumerate(starts)
+                           if occupancy_map.interception_possible(start, targets)], dtype=np.int64)
+
+    for offset in range(0, len(candidates), BATCH_SIZE):
+        chunk = candidates[offset:offset + BATCH_SIZE]
+        for k, t, path in _sweep_batch(starts[chunk], targets, occupancy_map, return_paths):
+            times[chunk[k]] = t
+            paths[chunk[k]] = path
+
+    return times, paths
+
+
+def _sweep_batch(starts: np.ndarray, targets: np.ndarray, occupancy_map: Map, return_paths: bool):
+
+    # Slice i of the stack is the layer of start active[i]. A start leaves the
+    # stack once it is resolved: caught, out of reachable cells, or settled on
+    # a fixed set, so the sweep shrinks as starts finish. For path recovery
+    # each start keeps its own layers, dropped as soon as it is resolved.
+    rows, cols = occupancy_map.grid.shape
+    free_words = occupancy_map.get_packed_free()
+    horizon = occupancy_map.overrides.horizon
+    active = np.arange(len(starts))
+    layer = np.zeros((len(starts),) + free_words.shape, dtype=np.uint64)
+    layer[active, starts[:, 0], starts[:, 1] >> 6] = np.uint64(1) << (starts[:, 1] & 63).astype(np.uint64)
+    history = [[words] for words in layer] if return_paths else None
+
+    def recover(k, goal, t):
+        if not return_paths:
+            return None
+        own, history[k] = history[k], None
+        return backtrack(goal, t, lambda s, px, py: bitset.is_set(own[min(s, len(own) - 1)], px, py), (rows, cols))
+
+    for t, (x, y) in enumerate(targets):
+        if t > 0:
+            next_layer = bitset.dilate(layer, occupancy_map.get_packed_free_at(t) if t < horizon else free_words)
+            keep = next_layer.any(axis=(1, 2))
+            if t >= horizon:
+                # A settled start stays on its set, so the rest of its
+                # trajectory reduces to a membership test
+                for i in np.flatnonzero(keep & (next_layer == layer).all(axis=(1, 2))):
+                    caught = _members(layer[i], targets[t:], rows, cols)
+                    if caught.size:
+                        goal = tuple(targets[t + caught[0]])
+                        yield int(active[i]), t + int(caught[0]), recover(active[i], goal, t + int(caught[0]))
+                    keep[i] = False
+            if return_paths:
+                for k in active[~keep]:
+                    history[k] = None
+            layer = next_layer
+            if not keep.all():
+                active, layer = active[keep], layer[keep]
+            if not len(active):
+                return
+            if return_paths:
+                for k, words in zip(active, layer):
+                    history[k].append(words.copy())
+
+        if not (0 <= x < rows and 0 <= y < cols):
+            continue
+        hits = ((layer[:, x, y >> 6] >> np.uint64(y & 63)) & np.uint64(1)).astype(bool)
+        for i in np.flatnonzero(hits):
+            yield int(active[i]), t, recover(active[i], (x, y), t)
+        if hits.any():
+            active, layer = active[~hits], layer[~hits]
+            if not len(active):
+                return
+
+
+def _members(words: np.ndarray, points: np.ndarray, rows: int, cols: int) -> np.ndarray:
+
+    # Indices of the points whose cell is set in one packed layer
+    inside = np.flatnonzero((points[:, 0] >= 0) & (points[:, 0] < rows) & (points[:, 1] >= 0) & (points[:, 1] < cols))
+    xs, ys = points[inside, 0], points[inside, 1]
+    return inside[((words[xs, ys >> 6] >> (ys & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)]
+
+
+class ReachableLayers:
+
+    # Bit-packed sets of cells the ego can occupy at each time step, grown on
+    # demand. Once the map stops changing the sequence becomes periodic: with
+    # period 1 when it settles on a fixed set, or period 2 in components
+    # without odd cycles, where the ego alternates between two sides. Layers
+    # are stored only until then, so memory is bounded by the map rather than
+    # by how far ahead the target is followed.
+
+    def __init__(self, start_point: tuple, occupancy_map: Map) -> None:
+
+        self.occupancy_map = occupancy_map
+        self.free_words = occupancy_map.get_packed_free()
+        self.overrides_version = occupancy_map.overrides.version
+        self.horizon = occupancy_map.overrides.horizon
+        layer = np.zeros_like(self.free_words)
+        layer[start_point[0], start_point[1] >> 6] = np.uint64(1) << np.uint64(start_point[1] & 63)
+        self.layers = [layer]
+        self.period = 0
+        self.exhausted = False
+
+    def stale(self) -> bool:
+
+        # Layers are only valid for the free space and overrides they were
+        # grown in
+        return self.occupancy_map.get_packed_free() is not self.free_words or \
+            self.occupancy_map.overrides.version != self.overrides_version
+
+    def get(self, t: int, result: SearchResult = None, on_expand=None, on_push=None) -> np.ndarray:
+
+        # Layer at time t, None once the reachable set has become empty.
+        # Counters for any growth go to result; callbacks receive (t, layer).
+        while len(self.layers) <= t and not self.period and not self.exhausted:
+            previous = self.layers[-1]
+            time_step = len(self.layers)
+            if on_expand is not None:
+                on_expand(time_step - 1, previous)
+            next_layer = bitset.dilate(previous, self.occupancy_map.get_packed_free_at(time_step)
+                                       if time_step < self.horizon else self.free_words)
+            layer_size = bitset.count(next_layer)
+            if result is not None:
+                result.expanded += bitset.count(previous)
+                result.pushes += layer_size
+                result.visited += layer_size
+                result.max_open = max(result.max_open, layer_size)
+            if not layer_size:
+                self.exhausted = True
+                break
+            if on_push is not None:
+                on_push(time_step, next_layer)
+            if time_step >= self.horizon:
+                if np.array_equal(next_layer, previous):
+                    self.period = 1
+                elif time_step > max(self.horizon, 1) and np.array_equal(next_layer, self.layers[-2]):
+                    self.period = 2
+            if not self.period:
+                self.layers.append(next_layer)
+
+        if t < len(self.layers):
+            return self.layers[t]
+        if self.exhausted:
+            return None
+        # Past the stored layers the sequence repeats with the period found
+        last = len(self.layers) - 1
+        return self.layers[last - (t - last) % self.period]
+
+
+def backtrack(goal: tuple, time_step: int, reached, shape: tuple) -> list:
+
+    # reached(t, x, y) tells whether the ego can be at (x, y) at time t; the
+    # first stencil direction leading back into the previous layer is taken
+
+    rows, cols = shape
+    path = [[int(goal[0]), int(goal[1])]]
+    x, y = goal
+
+    for t in range(time_step, 0, -1):
+        for dx, dy in EIGHT_CONNECTED:
+            px, py = x - dx, y - dy
+            if 0 <= px < rows and 0 <= py < cols and reached(t - 1, px, py):
+                x, y = px, py
+                break
+        path.append([int(x), int(y)])
+
+    return path[::-1]
+